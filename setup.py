@@ -8,11 +8,17 @@ setup(
         "numpy",
         "pandas",
         "requests",
+        "requests-cache",
         "python-dotenv",
         "scipy",
+        "pyarrow",
+        "numba",
         "matplotlib",
         "seaborn"
     ],
+    extras_require={
+        "frontier": ["cvxpy"],
+    },
     description="A CLI for Darwinex portfolio optimization, with preprocessed fees in data/processed.",
     author="Charly López",
     author_email="clriesco@gmail.com",
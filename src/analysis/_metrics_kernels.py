@@ -0,0 +1,148 @@
+"""
+_metrics_kernels.py
+Numba kernels for the single-series metrics: one or two passes over the array, no temporaries.
+MetricsCalculator only calls them when numba is installed and keeps a vectorized NumPy path otherwise.
+"""
+
+import numpy as np
+from src.jit import njit
+
+@njit(cache=True)
+def longest_drawdown(equity):
+    """
+    Longest run of consecutive days below the running peak, in a single pass.
+    A NaN makes the running peak NaN from then on, as np.maximum.accumulate does.
+
+    :param equity: 1-D contiguous array of cumulative equity.
+    :return: length of the longest drawdown, in days.
+    """
+    if equity.shape[0] == 0:
+        return 0
+    peak = equity[0]
+    current = 0
+    longest = 0
+    for x in equity:
+        if x < peak:
+            current += 1
+        else:
+            if current > longest:
+                longest = current
+            current = 0
+            # x > peak, or x is NaN; a NaN peak never moves again
+            if peak == peak and not x <= peak:
+                peak = x
+    if current > longest:
+        longest = current
+    return longest
+
+@njit(cache=True)
+def sharpe(r, rf_daily):
+    """
+    Annualized Sharpe ratio with the sample std (ddof=1).
+
+    :param r: 1-D contiguous array of daily returns.
+    :param rf_daily: daily risk-free rate.
+    :return: Sharpe ratio, 0.0 for fewer than 2 points or a constant series, NaN if r has a NaN.
+    """
+    n = r.shape[0]
+    if n < 2:
+        return 0.0
+    lo = r[0]
+    hi = r[0]
+    total = 0.0
+    has_nan = False
+    for x in r:
+        total += x
+        lo = min(lo, x)
+        hi = max(hi, x)
+        has_nan |= x != x
+    if has_nan:
+        return np.nan
+    if lo == hi:
+        return 0.0
+    mean = total / n
+    ss = 0.0
+    for x in r:
+        ss += (x - mean) * (x - mean)
+    std = np.sqrt(ss / (n - 1))
+    if std == 0:
+        return 0.0
+    return (mean - rf_daily) / std * np.sqrt(252.0)
+
+@njit(cache=True)
+def sortino(r, rf_daily):
+    """
+    Annualized Sortino ratio, using the sample std (ddof=1) of the negative returns.
+
+    :param r: 1-D contiguous array of daily returns.
+    :param rf_daily: daily risk-free rate.
+    :return: Sortino ratio, 0.0 for a constant series or fewer than 2 negative returns.
+             A NaN is not a negative return but makes the mean, hence the ratio, NaN.
+    """
+    n = r.shape[0]
+    if n < 2:
+        return 0.0
+    lo = r[0]
+    hi = r[0]
+    total = 0.0
+    neg_total = 0.0
+    n_neg = 0
+    has_nan = False
+    for x in r:
+        total += x
+        lo = min(lo, x)
+        hi = max(hi, x)
+        has_nan |= x != x
+        if x < 0.0:
+            neg_total += x
+            n_neg += 1
+    # min/max skip over NaN in a way that depends on its position: only trust them without one
+    if (lo == hi and not has_nan) or n_neg < 2:
+        return 0.0
+    neg_mean = neg_total / n_neg
+    ss = 0.0
+    for x in r:
+        if x < 0.0:
+            ss += (x - neg_mean) * (x - neg_mean)
+    d_std = np.sqrt(ss / (n_neg - 1))
+    if d_std == 0:
+        return 0.0
+    return (total / n - rf_daily) / d_std * np.sqrt(252.0)
+
+@njit(cache=True)
+def omega_sums(r, threshold):
+    """
+    Gains above and losses below a threshold, for the Omega ratio. The ratio itself is
+    taken by the caller, since it is infinite without losses. NaN compares false both ways
+    and is left out, as with the NumPy masks.
+
+    :param r: 1-D contiguous array of daily returns.
+    :param threshold: threshold for gains/losses.
+    :return: (sum of gains above threshold, sum of losses below threshold).
+    """
+    above = 0.0
+    below = 0.0
+    for x in r:
+        if x > threshold:
+            above += x - threshold
+        elif x < threshold:
+            below += threshold - x
+    return above, below
+
+_warm = False
+
+def warm_up():
+    """
+    Compile the float64 specializations, or load them from the cache=True on-disk cache,
+    once per process, so the first metric call doesn't pay for it. Called by MetricsCalculator
+    rather than at import, which would slow down commands that never compute a metric.
+    """
+    global _warm
+    if _warm:
+        return
+    r = np.array([0.01, -0.02, 0.03, -0.01])
+    sharpe(r, 0.0)
+    sortino(r, 0.0)
+    omega_sums(r, 0.0)
+    longest_drawdown(np.cumprod(1.0 + r))
+    _warm = True
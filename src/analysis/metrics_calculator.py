@@ -5,20 +5,47 @@ Provides various performance metrics for daily returns or equity curves.
 
 import pandas as pd
 import numpy as np
+from typing import Union
+from src.jit import HAS_NUMBA
+from src.analysis._metrics_kernels import longest_drawdown, omega_sums, sharpe, sortino, warm_up
+
+# Metrics accept either a pd.Series or a plain ndarray; both are reduced with numpy
+SeriesOrArray = Union[pd.Series, np.ndarray]
+
+def _to_np(values, dtype=np.float64) -> np.ndarray:
+    """
+    Convert a pd.Series (or any array-like) to an ndarray of `dtype` without copying when possible.
+
+    :param values: A pd.Series or array-like of numbers.
+    :param dtype: Target floating point dtype.
+    :return: An np.ndarray of `dtype`.
+    """
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=dtype, copy=False)
+    return np.asarray(values, dtype=dtype)
 
 class MetricsCalculator:
     """
     Calculates performance metrics such as Sharpe, Sortino, Max Drawdown, etc.
 
+    Metrics are computed in `dtype`. float64 is the default; float32 halves memory
+    traffic on large batches of equity curves at the cost of ~7 significant digits,
+    which is still well beyond the precision at which a Sharpe ratio is meaningful.
+
     Attributes:
         risk_free_rate (float): annual risk-free rate in decimal form.
+        dtype (np.dtype): floating point dtype used for the calculations.
     """
 
-    def __init__(self, risk_free_rate=0.0):
+    def __init__(self, risk_free_rate=0.0, dtype=np.float64):
         """
         :param risk_free_rate: Annual risk-free rate for metric calculations.
+        :param dtype: Floating point dtype, np.float64 (default) or np.float32.
         """
         self.risk_free_rate = risk_free_rate
+        self.dtype = np.dtype(dtype)
+        if HAS_NUMBA:
+            warm_up()
 
     def daily_returns(self, prices: pd.Series) -> pd.Series:
         """
@@ -29,83 +56,155 @@ class MetricsCalculator:
         """
         return prices.pct_change().fillna(0.0)
 
-    def sharpe_ratio(self, returns: pd.Series) -> float:
+    def sharpe_ratio(self, returns: SeriesOrArray) -> float:
         """
         Annualized Sharpe ratio.
 
-        :param returns: A pd.Series of daily returns.
+        :param returns: A pd.Series or np.ndarray of daily returns.
         :return: Sharpe ratio as float.
         """
-        excess = returns - self.risk_free_rate / 252
-        std = returns.std()
+        r = _to_np(returns, self.dtype)
+        if HAS_NUMBA:
+            return float(sharpe(np.ascontiguousarray(r), self.risk_free_rate / 252))
+
+        # Constant (e.g. padded) series have no volatility: skip the reductions
+        if r.size < 2 or np.ptp(r) == 0.0:
+            return 0.0
+        std = r.std(ddof=1)
         if std == 0:
             return 0.0
-        return (excess.mean() / std) * np.sqrt(252)
+        excess_mean = r.mean() - self.risk_free_rate / 252
+        return float(excess_mean / std * np.sqrt(252))
 
-    def sortino_ratio(self, returns: pd.Series) -> float:
+    def sortino_ratio(self, returns: SeriesOrArray) -> float:
         """
         Annualized Sortino ratio.
 
-        :param returns: A pd.Series of daily returns.
+        :param returns: A pd.Series or np.ndarray of daily returns.
         :return: Sortino ratio as float.
         """
-        excess = returns - self.risk_free_rate / 252
-        negative = returns[returns < 0]
-        d_std = negative.std()
+        r = _to_np(returns, self.dtype)
+        if HAS_NUMBA:
+            return float(sortino(np.ascontiguousarray(r), self.risk_free_rate / 252))
+
+        if r.size < 2 or np.ptp(r) == 0.0:
+            return 0.0
+        negative = r[r < 0.0]
+        if negative.size < 2:
+            return 0.0
+        d_std = negative.std(ddof=1)
         if d_std == 0:
             return 0.0
-        return (excess.mean() / d_std) * np.sqrt(252)
+        excess_mean = r.mean() - self.risk_free_rate / 252
+        return float(excess_mean / d_std * np.sqrt(252))
+
+    def sharpe_ratio_batch(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Annualized Sharpe ratio for many return series in one vectorized pass.
 
-    def max_drawdown(self, equity: pd.Series) -> float:
+        :param returns: 2-D array (P, T) of daily returns, one row per portfolio.
+        :return: np.ndarray (P,) of Sharpe ratios, 0.0 where std is 0.
+        """
+        R = np.asarray(returns, dtype=self.dtype)
+        excess_mean = R.mean(axis=1) - self.risk_free_rate / 252
+        std = R.std(axis=1, ddof=1)
+        constant = np.ptp(R, axis=1) == 0.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(constant | (std == 0), 0.0, excess_mean / std * self.dtype.type(np.sqrt(252)))
+
+    def sortino_ratio_batch(self, returns: np.ndarray) -> np.ndarray:
+        """
+        Annualized Sortino ratio for many return series in one vectorized pass.
+
+        :param returns: 2-D array (P, T) of daily returns, one row per portfolio.
+        :return: np.ndarray (P,) of Sortino ratios, 0.0 where downside std is 0 or undefined.
+        """
+        R = np.asarray(returns, dtype=self.dtype)
+        excess_mean = R.mean(axis=1) - self.risk_free_rate / 252
+        negative = np.where(R < 0, R, np.nan)
+        n_neg = (R < 0).sum(axis=1).astype(self.dtype)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            neg_mean = np.nansum(negative, axis=1) / n_neg
+            d_std = np.sqrt(np.nansum((negative - neg_mean[:, None]) ** 2, axis=1) / (n_neg - 1))
+            valid = (n_neg > 1) & (d_std > 0) & (np.ptp(R, axis=1) > 0.0)
+            return np.where(valid, excess_mean / d_std * self.dtype.type(np.sqrt(252)), 0.0)
+
+    def max_drawdown(self, equity: SeriesOrArray) -> float:
         """
         Maximum drawdown from an equity curve.
 
-        :param equity: A pd.Series representing cumulative equity.
+        :param equity: A pd.Series or np.ndarray representing cumulative equity.
         :return: The minimum (negative) drawdown.
         """
-        roll_max = equity.cummax()
-        dd = (equity - roll_max) / roll_max
-        return dd.min()
+        eq = _to_np(equity, self.dtype)
+        roll_max = np.maximum.accumulate(eq)
+        dd = eq - roll_max
+        np.divide(dd, np.maximum(roll_max, np.finfo(self.dtype).tiny), out=dd)
+        return float(dd.min())
 
-    def total_return(self, equity: pd.Series) -> float:
+    def max_drawdown_batch(self, equity: np.ndarray) -> np.ndarray:
+        """
+        Maximum drawdown for many equity curves in one vectorized pass.
+
+        :param equity: 2-D array (P, T) of cumulative equity, one row per portfolio.
+        :return: np.ndarray (P,) with the minimum (negative) drawdown of each curve.
+        """
+        E = np.asarray(equity, dtype=self.dtype)
+        roll_max = np.maximum.accumulate(E, axis=1)
+        dd = E - roll_max
+        np.divide(dd, np.maximum(roll_max, np.finfo(self.dtype).tiny), out=dd)
+        return dd.min(axis=1)
+
+    def total_return(self, equity: SeriesOrArray) -> float:
         """
         Total return over the entire equity curve.
 
-        :param equity: A pd.Series representing cumulative equity.
+        :param equity: A pd.Series or np.ndarray representing cumulative equity.
         :return: decimal form e.g. 0.5 for +50%
         """
-        return (equity.iloc[-1] / equity.iloc[0]) - 1
+        eq = _to_np(equity, self.dtype)
+        return float(eq[-1] / eq[0] - 1)
 
-    def longest_drawdown_period(self, equity: pd.Series) -> int:
+    def longest_drawdown_period(self, equity: SeriesOrArray) -> int:
         """
         Returns the longest drawdown (in days).
 
-        :param equity: A pd.Series representing cumulative equity.
+        :param equity: A pd.Series or np.ndarray representing cumulative equity.
         :return: integer, max consecutive days in drawdown.
         """
-        roll_max = equity.cummax()
-        dd = (equity - roll_max) / roll_max
-        is_dd = dd < 0
-        dd_periods = is_dd.astype(int).groupby((is_dd != is_dd.shift()).cumsum()).cumsum()
-        return dd_periods.max()
+        eq = _to_np(equity, self.dtype)
+        if eq.size == 0:
+            return 0
+        if HAS_NUMBA:
+            return int(longest_drawdown(np.ascontiguousarray(eq)))
+
+        roll_max = np.maximum.accumulate(eq)
+        is_dd = eq < roll_max
+
+        # Run-length encode is_dd: boundaries are the positions where the value changes
+        bounds = np.flatnonzero(np.concatenate(([True], is_dd[1:] != is_dd[:-1], [True])))
+        lengths = np.diff(bounds)
+        values = is_dd[bounds[:-1]]
+        return int(lengths[values].max(initial=0))
 
-    def calmar_ratio(self, equity: pd.Series) -> float:
+    def calmar_ratio(self, equity: SeriesOrArray) -> float:
         """
         Calmar ratio = annual return / max drawdown
 
         :param equity: equity curve
         :return: Calmar ratio float
         """
-        days = len(equity)
+        eq = _to_np(equity, self.dtype)
+        days = eq.size
         if days < 2:
             return 0.0
-        ann_return = (equity.iloc[-1] / equity.iloc[0]) ** (252 / days) - 1
-        mdd = self.max_drawdown(equity)
+        ann_return = float((eq[-1] / eq[0]) ** (252 / days) - 1)
+        mdd = self.max_drawdown(eq)
         if mdd == 0:
             return np.inf
         return ann_return / abs(mdd)
 
-    def omega_ratio(self, returns: pd.Series, threshold=0.0) -> float:
+    def omega_ratio(self, returns: SeriesOrArray, threshold=0.0) -> float:
         """
         Omega ratio above a threshold.
 
@@ -113,8 +212,12 @@ class MetricsCalculator:
         :param threshold: threshold for gains/losses
         :return: Omega ratio
         """
-        above = returns[returns > threshold] - threshold
-        below = threshold - returns[returns < threshold]
-        if below.sum() == 0:
+        r = _to_np(returns, self.dtype)
+        if HAS_NUMBA:
+            above, below = omega_sums(np.ascontiguousarray(r), threshold)
+        else:
+            above = (r[r > threshold] - threshold).sum()
+            below = (threshold - r[r < threshold]).sum()
+        if below == 0:
             return np.inf
-        return above.sum() / below.sum()
+        return float(above / below)
@@ -55,15 +55,19 @@ def main():
                              help="If set, finds the best subset under equal weighting. Optional.")
     parser_best.add_argument("--max-darwins", type=int,
                              help="Maximum number of assets in a final portfolio. Optional. No limit if not specified.")
+    parser_best.add_argument("--no-plot", action="store_true",
+                             help="Skip all plots, only print the metrics. Optional.")
+    parser_best.add_argument("--plot-top-k", type=int, default=3,
+                             help="Number of top portfolios whose equity is plotted. Optional. Default=3")
 
     args = parser.parse_args()
 
     if args.command == "download":
         start_date = args.start if args.start else "2022-01-01"
         end_date = args.end if args.end else datetime.now().strftime("%Y-%m-%d")
-        api_client = DarwinexInfoAPIClient()
-        data_service = DataService(api_client)
-        data_service.fetch_and_save_quotes(args.darwins, start_date, end_date, args.save_path)
+        with DarwinexInfoAPIClient() as api_client:
+            data_service = DataService(api_client)
+            data_service.fetch_and_save_quotes(args.darwins, start_date, end_date, args.save_path)
 
     elif args.command == "calculate-fees":
         from src.data_fetcher.fees_preprocessor import FeesPreprocessor
@@ -83,7 +87,9 @@ def main():
             save_path=args.save_path if args.save_path else "data/processed",
             leverage=args.leverage,
             equal_weights=args.equal_weights,
-            max_darwins=args.max_darwins
+            max_darwins=args.max_darwins,
+            plot=not args.no_plot,
+            plot_top_k=args.plot_top_k
         )
 
     else:
@@ -5,7 +5,11 @@ Manages downloading and saving DARWIN quotes from the Info API.
 
 import os
 import time
-import pandas as pd
+import asyncio
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+from concurrent.futures import ThreadPoolExecutor
 from .info_api_client import DarwinexInfoAPIClient
 
 class DataService:
@@ -20,10 +24,14 @@ class DataService:
         self.api_client = api_client
         # Read throttling seconds from environment (optional). Default=6.0 if not set
         self.throttling_seconds = float(os.getenv("DARWINEX_THROTTLING_SECONDS", "6.0"))
+        # Read max concurrent downloads from environment (optional). Default=4 if not set
+        self.max_concurrency = max(1, int(os.getenv("DARWINEX_MAX_CONCURRENCY", "4")))
 
     def fetch_and_save_quotes(self, product_list, start_date, end_date, save_path="data/raw"):
         """
         For each product in product_list, fetch quotes and save as CSV.
+        Up to max_concurrency downloads are in flight at once, while request
+        start times are still spaced by throttling_seconds.
         Catches exceptions to avoid crashing on 404 or similar errors.
 
         :param product_list: List of DARWIN symbols to download.
@@ -34,38 +42,108 @@ class DataService:
         if not os.path.exists(save_path):
             os.makedirs(save_path)
 
-        for i, product_name in enumerate(product_list):
+        asyncio.run(self._fetch_all(product_list, start_date, end_date, save_path))
+
+    async def _fetch_all(self, product_list, start_date, end_date, save_path):
+        """
+        Download every product concurrently. The API client is blocking, so HTTP
+        requests and CSV writes run in a thread pool driven by the event loop.
+
+        :param product_list: List of DARWIN symbols to download.
+        :param start_date: Start date (YYYY-MM-DD).
+        :param end_date: End date (YYYY-MM-DD).
+        :param save_path: Directory to save the resulting CSV files.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        limiter = _RateLimiter(self.throttling_seconds)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            await asyncio.gather(*[
+                self._fetch_one(pool, semaphore, limiter, product_name, start_date, end_date, save_path)
+                for product_name in product_list
+            ])
+
+    async def _fetch_one(self, pool, semaphore, limiter, product_name, start_date, end_date, save_path):
+        """
+        Fetch and save the quotes of a single product.
+
+        :param pool: ThreadPoolExecutor running the blocking calls.
+        :param semaphore: asyncio.Semaphore bounding the number of downloads in flight.
+        :param limiter: _RateLimiter spacing out requests that reach the API.
+        :param product_name: DARWIN symbol to download.
+        :param start_date: Start date (YYYY-MM-DD).
+        :param end_date: End date (YYYY-MM-DD).
+        :param save_path: Directory to save the resulting CSV file.
+        """
+        loop = asyncio.get_running_loop()
+        async with semaphore:
+            # Responses served from the disk cache never reach the API, so they are not throttled.
+            # The lookup hits SQLite, so it runs in the pool rather than blocking the event loop.
+            cached = await loop.run_in_executor(
+                pool, self.api_client.is_cached, product_name, start_date, end_date
+            )
+            if not cached:
+                await limiter.wait()
+
             try:
-                data = self.api_client.get_quotes(product_name, start_date, end_date)
+                data = await loop.run_in_executor(
+                    pool, self.api_client.get_quotes, product_name, start_date, end_date
+                )
             except Exception as ex:
                 print(f"[ERROR] Could not download data for {product_name}: {ex}")
-                continue
+                return
 
             if not data:
                 print(f"[WARN] No data returned for {product_name} in {start_date} -> {end_date}. Skipped.")
-                continue
+                return
 
-            df = self._convert_to_dataframe(data)
+            table = self._convert_to_table(data)
             filename = f"{product_name}_{start_date}_{end_date}.csv"
             full_path = os.path.join(save_path, filename)
-            df.to_csv(full_path, index=False)
+            await loop.run_in_executor(pool, pa_csv.write_csv, table, full_path)
             print(f"[INFO] Saved data to: {full_path}")
 
-            # Apply throttling after each successful download, if throttling_seconds > 0
-            if self.throttling_seconds > 0.0 and i < len(product_list) - 1:
-                # Evita la pausa tras el último activo (opcional)
-                time.sleep(self.throttling_seconds)
-
-    def _convert_to_dataframe(self, raw_data):
+    def _convert_to_table(self, raw_data):
         """
-        Convert array of [timestamp_ms, quote] into a DataFrame with columns [date, close].
+        Convert array of [timestamp_ms, quote] into an Arrow table with columns [date, close],
+        without going through pandas.
 
         :param raw_data: List of [timestamp_ms, quote].
-        :return: A pd.DataFrame sorted by date with columns ['date','close'].
+        :return: A pa.Table sorted by date with columns ['date','close'].
+        """
+        ts = pa.array([row[0] for row in raw_data], type=pa.int64())
+        close = pa.array([row[1] for row in raw_data], type=pa.float64())
+        table = pa.table({
+            "date": ts.cast(pa.timestamp("ms", tz="UTC")),
+            "close": close
+        })
+
+        # The API normally returns quotes in chronological order, so only sort when needed
+        if len(ts) > 1 and not pc.all(pc.greater_equal(ts[1:], ts[:-1])).as_py():
+            table = table.take(pc.sort_indices(table, sort_keys=[("date", "ascending")]))
+        return table
+
+
+class _RateLimiter:
+    """
+    Spaces out request start times by at least `interval` seconds.
+    """
+
+    def __init__(self, interval):
+        """
+        :param interval: Minimum seconds between two consecutive requests. <= 0 disables throttling.
+        """
+        self.interval = interval
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        """
+        Sleep until the next request slot is free, then reserve it.
         """
-        df = pd.DataFrame(raw_data, columns=["timestamp_ms", "close"])
-        df["date"] = pd.to_datetime(df["timestamp_ms"], unit="ms", utc=True)
-        df = df[["date", "close"]]
-        df.sort_values("date", inplace=True)
-        df.reset_index(drop=True, inplace=True)
-        return df
+        if self.interval <= 0.0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + self.interval
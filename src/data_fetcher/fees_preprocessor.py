@@ -7,7 +7,10 @@ Implements a three-step process for applying daily performance fees to raw price
 """
 
 import os
+import numpy as np
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.jit import njit, HAS_NUMBA
 
 class FeesPreprocessor:
     """
@@ -37,22 +40,15 @@ class FeesPreprocessor:
             os.makedirs(processed_path)
 
         csv_files = [f for f in os.listdir(raw_path) if f.endswith(".csv")]
-        for fname in csv_files:
-            full_in = os.path.join(raw_path, fname)
-            df = pd.read_csv(full_in, parse_dates=["date"])
-            if len(df) < 2:
-                print(f"[WARN] Not enough data in {fname}. Skipped.")
-                continue
-
-            # Ensure data is sorted by date
-            df.sort_values("date", inplace=True)
-            df.reset_index(drop=True, inplace=True)
-
-            processed_df = self._apply_fee_process(df)
-            out_name = fname  # keep the same filename
-            out_full = os.path.join(processed_path, out_name)
-            processed_df.to_csv(out_full, index=False)
-            print(f"[INFO] Fees processed for {fname}, new file: {out_full}")
+        args_list = [
+            (os.path.join(raw_path, fname), os.path.join(processed_path, fname), self.fee_rate)
+            for fname in csv_files  # keep the same filename
+        ]
+
+        # Each file is independent, so spread them across CPU cores
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as ex:
+            for message in ex.map(_process_one, args_list, chunksize=4):
+                print(message)
 
     def _apply_fee_process(self, df):
         """
@@ -61,37 +57,84 @@ class FeesPreprocessor:
         :param df: DataFrame with columns ['date', 'close'] sorted by date.
         :return: A new DataFrame with the same columns, but 'close' reflecting the net effect of fees.
         """
-        df = df.copy()
-
-        # 1) daily_returns: for t >= 1 => r_t = close_t / close_{t-1} - 1
-        daily_returns = []
-        daily_returns.append(0.0)  # The first day has no prior day, so daily return = 0
-
-        for i in range(1, len(df)):
-            prev_price = df.loc[i - 1, "close"]
-            curr_price = df.loc[i, "close"]
-            raw_ret = (curr_price / prev_price) - 1.0
-            daily_returns.append(raw_ret)
-
-        # 2) subtract fee_rate from positive returns
-        adj_returns = []
-        for ret in daily_returns:
-            if ret > 0:
-                net_ret = ret * (1 - self.fee_rate)
+        close = np.ascontiguousarray(df["close"].to_numpy(dtype=np.float64, copy=False))
+        new_close = np.empty_like(close)
+        # Both implementations seed out[0] = close[0], and the numba kernel has no bounds check
+        if close.size > 0:
+            if HAS_NUMBA:
+                _apply_fees_kernel(close, self.fee_rate, new_close)
             else:
-                net_ret = ret
-            adj_returns.append(net_ret)
-
-        # 3) rebuild the price series: new_close[0] = df.close[0], new_close[t] = new_close[t-1] * (1 + adj_returns[t])
-        new_close = []
-        new_close.append(df.loc[0, "close"])  # first day remains the same
-
-        for i in range(1, len(df)):
-            new_price = new_close[i - 1] * (1.0 + adj_returns[i])
-            new_close.append(new_price)
+                _apply_fees_numpy(close, self.fee_rate, new_close)
 
+        # Share the date buffer with the input instead of copying it
         out_df = pd.DataFrame({
-            "date": df["date"],
+            "date": df["date"].array,
             "close": new_close
-        })
+        }, copy=False)
         return out_df
+
+
+@njit(cache=True, fastmath=True)
+def _apply_fees_kernel(close, fee_rate, out):
+    """
+    Fused single-pass version of the three-step fee process.
+
+    :param close: Contiguous float64 array of close prices.
+    :param fee_rate: Decimal performance fee rate.
+    :param out: Preallocated float64 array receiving the fees-adjusted prices.
+    """
+    out[0] = close[0]
+    for i in range(1, close.shape[0]):
+        r = close[i] / close[i - 1] - 1.0
+        r -= fee_rate * max(r, 0.0)
+        out[i] = out[i - 1] * (1.0 + r)
+
+def _apply_fees_numpy(close, fee_rate, out):
+    """
+    Vectorized NumPy version of the three-step fee process, used when numba is unavailable.
+
+    :param close: float64 array of close prices.
+    :param fee_rate: Decimal performance fee rate.
+    :param out: Preallocated float64 array receiving the fees-adjusted prices.
+    """
+    # 1) daily_returns: for t >= 1 => r_t = close_t / close_{t-1} - 1
+    #    The first day has no prior day, so daily return = 0
+    ret = np.empty_like(close)
+    ret[0] = 0.0
+    np.divide(close[1:], close[:-1], out=ret[1:])
+    ret[1:] -= 1.0
+
+    # 2) subtract fee_rate from positive returns, branchless: r -= fee_rate * max(r, 0)
+    tmp = np.empty_like(close)
+    np.maximum(ret, 0.0, out=tmp)
+    tmp *= fee_rate
+    np.subtract(ret, tmp, out=ret)
+
+    # 3) rebuild the price series: out[0] = close[0], out[t] = out[t-1] * (1 + ret[t])
+    out[0] = close[0]
+    np.cumprod(1.0 + ret[1:], out=out[1:])
+    out[1:] *= close[0]
+
+def _process_one(args):
+    """
+    Apply the fee process to a single CSV file. Module-level so it can be
+    dispatched to a worker process.
+
+    :param args: Tuple (in_path, out_path, fee_rate).
+    :return: A log message describing the outcome.
+    """
+    in_path, out_path, fee_rate = args
+    fname = os.path.basename(in_path)
+
+    # The pyarrow engine parses multi-threaded in C++ instead of the legacy C parser
+    df = pd.read_csv(in_path, engine="pyarrow", parse_dates=["date"])
+    if len(df) < 2:
+        return f"[WARN] Not enough data in {fname}. Skipped."
+
+    # Ensure data is sorted by date (downloaded files already are, so avoid the copy)
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date", ignore_index=True)
+
+    processed_df = FeesPreprocessor(fee_rate=fee_rate)._apply_fee_process(df)
+    processed_df.to_csv(out_path, index=False)
+    return f"[INFO] Fees processed for {fname}, new file: {out_path}"
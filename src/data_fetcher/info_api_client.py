@@ -4,7 +4,9 @@ Handles Darwinex Info API requests with Bearer token from .env
 """
 
 import os
+import threading
 import requests
+from requests_cache import CachedSession
 from dotenv import load_dotenv
 from datetime import datetime, timezone
 
@@ -17,16 +19,61 @@ class DarwinexInfoAPIClient:
     Attributes:
         api_key (str): Darwinex Info API key.
         base_url (str): The base URL for the Info API.
+        session (CachedSession): Persistent HTTP session of the calling thread, caching responses on disk.
+        timeout (float): Request timeout in seconds.
     """
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache_name=".darwinex_cache", expire_after=86400, timeout=30):
         """
         Initialize the client, loading the API key from .env if none is provided.
 
         :param api_key: Darwinex Info API key string or None.
+        :param cache_name: Path (without extension) of the SQLite response cache.
+        :param expire_after: Seconds before a cached response expires. Default=86400 (1 day).
+        :param timeout: Seconds to wait for the API before giving up. Default=30.
         """
         self.api_key = api_key or os.getenv("DARWINEX_API_KEY")
         self.base_url = "https://api.darwinex.com/darwininfo/2.1"
+        self.cache_name = cache_name
+        self.expire_after = expire_after
+        self.timeout = timeout
+        # requests.Session is not thread-safe: each thread gets its own on the shared cache
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        The calling thread's session, created on first use. A persistent session keeps the
+        TLS connection alive across requests; all of them share one SQLite cache.
+
+        :return: CachedSession with the Bearer token set
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = CachedSession(cache_name=self.cache_name, backend="sqlite", expire_after=self.expire_after)
+            session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the HTTP sessions of every thread and their pooled connections.
+        """
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
 
     def _date_to_epoch_ms(self, date_str: str) -> int:
         """
@@ -39,6 +86,33 @@ class DarwinexInfoAPIClient:
         dt = dt.replace(tzinfo=timezone.utc)
         return int(dt.timestamp() * 1000)
 
+    def _quotes_request(self, product_name: str, start_date: str, end_date: str):
+        """
+        Build the request for /products/{productName}/history/quotes
+
+        :param product_name: DARWIN symbol like "PXQ"
+        :param start_date: Start date in "YYYY-MM-DD"
+        :param end_date: End date in "YYYY-MM-DD"
+        :return: An unsent requests.Request
+        """
+        url = f"{self.base_url}/products/{product_name}/history/quotes"
+        params = {"start": self._date_to_epoch_ms(start_date), "end": self._date_to_epoch_ms(end_date)}
+        return requests.Request("GET", url, params=params)
+
+    def is_cached(self, product_name: str, start_date: str, end_date: str) -> bool:
+        """
+        Check whether the quotes for this product and window are in the disk cache and not expired.
+
+        :param product_name: DARWIN symbol like "PXQ"
+        :param start_date: Start date in "YYYY-MM-DD"
+        :param end_date: End date in "YYYY-MM-DD"
+        :return: True if get_quotes would be served without an HTTP round-trip
+        """
+        request = self._quotes_request(product_name, start_date, end_date)
+        # Expired entries stay in the backend until overwritten, so the key alone is not enough
+        cached = self.session.cache.get_response(self.session.cache.create_key(request))
+        return cached is not None and not cached.is_expired
+
     def get_quotes(self, product_name: str, start_date: str, end_date: str):
         """
         Retrieve historical quotes from /products/{productName}/history/quotes
@@ -48,14 +122,9 @@ class DarwinexInfoAPIClient:
         :param end_date: End date in "YYYY-MM-DD"
         :return: A list of [timestamp_ms, quote] items
         """
-        start_ms = self._date_to_epoch_ms(start_date)
-        end_ms = self._date_to_epoch_ms(end_date)
-
-        url = f"{self.base_url}/products/{product_name}/history/quotes"
-        headers = {"Authorization": f"Bearer {self.api_key}"}
-        params = {"start": start_ms, "end": end_ms}
+        request = self._quotes_request(product_name, start_date, end_date)
 
-        response = requests.get(url, headers=headers, params=params)
+        response = self.session.get(request.url, params=request.params, timeout=self.timeout)
         if response.status_code == 200:
             return response.json()
         else:
@@ -0,0 +1,19 @@
+"""
+jit.py
+Optional numba support shared by the numeric kernels.
+Functions decorated with `njit` are compiled when numba is installed and run as plain Python otherwise.
+"""
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba is optional
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """
+        No-op stand-in for numba.njit, usable both as @njit and @njit(...).
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
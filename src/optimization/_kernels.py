@@ -0,0 +1,133 @@
+"""
+_kernels.py
+Numba kernels for the equal-weights subset search and the SLSQP max-Sharpe objective.
+The subset search only uses whole-column array operations, so it stays vectorized when numba is not installed.
+Pass R in Fortran order (np.asfortranarray) so each asset column is contiguous.
+"""
+
+import numpy as np
+from src.jit import njit
+
+# Returned instead of -inf for undefined Sharpe ratios, since fastmath assumes finite values
+NO_SHARPE = -1e18
+
+@njit(cache=True, fastmath=True)
+def _sharpe_of_sum(port_sum, scale):
+    """
+    Annualized Sharpe (sample std) of port_sum * scale.
+
+    :param port_sum: 1-D array of summed daily returns.
+    :param scale: leverage / number of assets.
+    :return: Sharpe ratio, or NO_SHARPE if the std is 0.
+    """
+    daily_net = port_sum * scale
+    mean_ret = daily_net.mean()
+    dev = daily_net - mean_ret
+    std_ret = np.sqrt((dev * dev).sum() / (daily_net.shape[0] - 1))
+    if std_ret == 0:
+        return NO_SHARPE
+    return mean_ret * 252 / (std_ret * np.sqrt(252.0))
+
+@njit(cache=True, fastmath=True)
+def eq_subset_gray_search(R, leverage):
+    """
+    Best equal-weights subset by exhaustive search, visiting subsets in Gray-code order
+    so each step adds or removes a single asset column from a running sum.
+
+    :param R: 2-D array (T, M) of daily returns, M small enough to enumerate 2^M subsets.
+    :param leverage: leverage factor applied to daily returns.
+    :return: bitmask of the best subset (bit j set => asset j selected), 0 if none is valid.
+    """
+    T, M = R.shape
+    port_sum = np.zeros(T)
+    best_sharpe = NO_SHARPE
+    best_mask = 0
+    prev_gray = 0
+    for i in range(1, 1 << M):
+        gray = i ^ (i >> 1)
+        diff = gray ^ prev_gray
+        k = 0
+        while (diff >> k) != 1:
+            k += 1
+        if gray & diff:
+            port_sum += R[:, k]
+        else:
+            port_sum -= R[:, k]
+        prev_gray = gray
+
+        size = 0
+        for j in range(M):
+            size += (gray >> j) & 1
+        shr = _sharpe_of_sum(port_sum, leverage / size)
+        if shr > best_sharpe:
+            best_sharpe = shr
+            best_mask = gray
+    return best_mask
+
+@njit(cache=True, fastmath=True)
+def eq_subset_backward_elimination(R, leverage):
+    """
+    Start with all assets and drop the first one whose removal improves the equal-weights
+    Sharpe, until no removal helps. A running sum of the active columns is kept, so each
+    trial costs O(T) instead of re-summing the (n-1) remaining columns.
+
+    :param R: 2-D array (T, M) of daily returns.
+    :param leverage: leverage factor applied to daily returns.
+    :return: boolean array (M,) of the assets kept.
+    """
+    T, M = R.shape
+    active = np.ones(M, dtype=np.bool_)
+    port_sum = np.zeros(T)
+    for j in range(M):
+        port_sum += R[:, j]
+    n = M
+
+    best_val = _sharpe_of_sum(port_sum, leverage / n)
+    improved = True
+    while improved and n > 1:
+        improved = False
+        for j in range(M):
+            if not active[j]:
+                continue
+            test_val = _sharpe_of_sum(port_sum - R[:, j], leverage / (n - 1))
+            if test_val > best_val:
+                best_val = test_val
+                port_sum -= R[:, j]
+                active[j] = False
+                n -= 1
+                improved = True
+                break
+    return active
+
+@njit(cache=True, fastmath=True)
+def neg_sharpe_and_grad(weights, mu, sigma, lev_sign):
+    """
+    Negative annualized Sharpe of a portfolio and its analytic gradient, from the moments:
+    mean = mu @ w and std = sqrt(w @ Sigma @ w). Compiled as a whole, so each SLSQP
+    evaluation is a single call instead of a handful of small NumPy dispatches.
+
+    :param weights: 1-D array of portfolio weights.
+    :param mu: mean daily return per asset.
+    :param sigma: C-contiguous sample covariance matrix (ddof=1) of the daily returns.
+    :param lev_sign: sign of the leverage (+1.0 or -1.0).
+    :return: (-sharpe, gradient), or (1e6, zeros) if the portfolio has no variance.
+    """
+    n = weights.shape[0]
+    sigma_w = np.empty(n)
+    mean_ret = 0.0
+    var = 0.0
+    for i in range(n):
+        acc = 0.0
+        for j in range(n):
+            acc += sigma[i, j] * weights[j]
+        sigma_w[i] = acc
+        mean_ret += mu[i] * weights[i]
+        var += weights[i] * acc
+    grad = np.zeros(n)
+    if var <= 0.0:
+        return 1e6, grad
+    std_ret = np.sqrt(var)
+    scale = lev_sign * np.sqrt(252.0)
+    for i in range(n):
+        grad[i] = -scale * (mu[i] * std_ret - mean_ret * sigma_w[i] / std_ret) / var
+    return -scale * mean_ret / std_ret, grad
@@ -3,6 +3,8 @@ constraints.py
 Defines any specialized constraints or methods to build them for the portfolio optimization.
 """
 
+import numpy as np
+
 def get_exposure_bounds(num_assets: int):
     """
     Returns a list of (min_w, max_w) for each asset,
@@ -11,3 +13,18 @@ def get_exposure_bounds(num_assets: int):
     min_w = 1.0 / (2 * num_assets)
     max_w = 2.0 / num_assets
     return [(min_w, max_w)] * num_assets
+
+def _sum_minus_one(weights):
+    """
+    Equality constraint residual: sum(weights) - 1.
+    """
+    return weights.sum() - 1.0
+
+def _ones(weights):
+    """
+    Jacobian of _sum_minus_one, constant so SLSQP never estimates it by finite differences.
+    """
+    return np.ones_like(weights)
+
+# Fully invested portfolio, shared by every SLSQP call
+SUM_TO_ONE = ({"type": "eq", "fun": _sum_minus_one, "jac": _ones},)
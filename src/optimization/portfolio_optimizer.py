@@ -6,6 +6,7 @@ Contains classes and methods to optimize portfolio weights given return data.
 import numpy as np
 import pandas as pd
 from scipy.optimize import minimize
+from src.optimization.constraints import SUM_TO_ONE
 
 class PortfolioOptimizer:
     """
@@ -34,27 +35,50 @@ class PortfolioOptimizer:
         """
         returns_df = pd.DataFrame(returns_dict)
 
+        # Convert once so the objective only does NumPy work on each SLSQP evaluation.
+        # Dates missing for some assets count as a zero return for them, as the pandas
+        # row sum (skipna) did, instead of turning every portfolio return into NaN
+        R = returns_df.fillna(0.0).to_numpy(dtype=np.float64, copy=False)
+        leverage = self.leverage
+        fees = self.performance_fees
+        sqrt_252 = np.sqrt(252.0)
+
         def objective(weights):
             """
             Objective function for portfolio optimization (e.g. maximize Sharpe => minimize negative Sharpe).
             """
-            portfolio_returns = (returns_df * weights).sum(axis=1)
+            portfolio_returns = R @ weights
             # Adjust for fees and leverage
-            net_returns = portfolio_returns * self.leverage - self.performance_fees * abs(portfolio_returns)
-            mean_ret = net_returns.mean() * 252
-            std_ret = net_returns.std() * np.sqrt(252)
+            net_returns = portfolio_returns * leverage - fees * np.abs(portfolio_returns)
+            mean_ret = net_returns.mean() * 252.0
+            std_ret = net_returns.std(ddof=1) * sqrt_252
             if std_ret == 0:
                 return 1e6
             return -(mean_ret / std_ret)
 
+        def gradient(weights):
+            """
+            Analytic gradient of the objective. With c = leverage - fees * sign(R @ w),
+            net = (R @ w) * c, so d(net)/dw = R * c and the mean/std derivatives are matvecs.
+            """
+            portfolio_returns = R @ weights
+            c = leverage - fees * np.sign(portfolio_returns)
+            net_returns = portfolio_returns * c
+            n_obs = net_returns.shape[0]
+            mean_net = net_returns.mean()
+            dev = net_returns - mean_net
+            std_net = np.sqrt(dev @ dev / (n_obs - 1))
+            if std_net == 0:
+                return np.zeros_like(weights)
+            d_mean = (R.T @ c) / n_obs
+            d_std = (R.T @ (dev * c)) / ((n_obs - 1) * std_net)
+            return -sqrt_252 * (d_mean * std_net - mean_net * d_std) / std_net ** 2
+
         num_assets = len(returns_dict.keys())
         init_weights = np.array([1.0 / num_assets] * num_assets)
         bounds = [(0.0, 1.0)] * num_assets
-        constraints = [
-            {"type": "eq", "fun": lambda w: np.sum(w) - 1.0},
-        ]
 
-        result = minimize(objective, init_weights, method="SLSQP", bounds=bounds, constraints=constraints)
+        result = minimize(objective, init_weights, method="SLSQP", jac=gradient, bounds=bounds, constraints=SUM_TO_ONE)
         if not result.success:
             print("Optimization failed:", result.message)
 
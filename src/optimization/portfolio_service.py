@@ -14,12 +14,23 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 from scipy.optimize import minimize
-from random import uniform
+from functools import partial, lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from src.analysis.metrics_calculator import MetricsCalculator
-from src.optimization.constraints import get_exposure_bounds
+from src.optimization.constraints import SUM_TO_ONE, get_exposure_bounds
+from src.optimization._kernels import eq_subset_backward_elimination, eq_subset_gray_search, neg_sharpe_and_grad
 from src.visualization.plotter import Plotter
 
+try:
+    import cvxpy as cp
+    HAS_CVXPY = True
+except ImportError:
+    HAS_CVXPY = False
+
+# Processed CSVs are named {DARWIN}_{start}_{end}.csv
+_FILE_PATTERN = re.compile(r"^(?P<darwin>[A-Z0-9]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2})\.csv$")
+
 class PortfolioService:
     """
     PortfolioService orchestrates:
@@ -33,16 +44,23 @@ class PortfolioService:
         risk_free_rate (float): annual risk-free rate in decimal form.
         max_random_tries_factor (int): factor to multiply by num_portfolios for random restarts.
         leverage (float): leverage factor that scales daily returns, default=1.0
+        seed (int or None): entropy for the random restarts, None for fresh OS entropy.
+
+    Distinct portfolios come from the cvxpy frontier sweep when the optional cvxpy extra is
+    installed, which is deterministic; max_random_tries_factor and seed only apply to the
+    SLSQP random restarts used without it.
     """
 
-    def __init__(self, risk_free_rate=0.02, max_random_tries_factor=30):
+    def __init__(self, risk_free_rate=0.02, max_random_tries_factor=30, seed=None):
         """
         :param risk_free_rate: annual risk-free rate for Sharpe, etc.
-        :param max_random_tries_factor: factor for random restarts.
+        :param max_random_tries_factor: factor for random restarts (SLSQP fallback only).
+        :param seed: optional seed to make the random restarts reproducible (SLSQP fallback only).
         """
         self.risk_free_rate = risk_free_rate
         self.max_random_tries_factor = max_random_tries_factor
         self.leverage = 1.0
+        self.seed = seed
 
     def generate_best_portfolios(
         self,
@@ -54,7 +72,9 @@ class PortfolioService:
         save_path=None,
         leverage=None,
         equal_weights=False,
-        max_darwins=None
+        max_darwins=None,
+        plot=True,
+        plot_top_k=3
     ):
         """
         Main entry point to generate best portfolios from data.
@@ -68,6 +88,10 @@ class PortfolioService:
         :param leverage: Leverage factor, default=1.0
         :param equal_weights: If True, find best subset for eq-wgts instead of distinct optimization.
         :param max_darwins: If not None, limit the final portfolio to at most `max_darwins` assets.
+        :param plot: If False, skip every figure (metrics are still printed and returned).
+        :param plot_top_k: Only plot the equity curves of the first `plot_top_k` portfolios.
+        :return: dict with "symbols" and "portfolios" (list of {"tag", "weights", "metrics"}),
+                 or None if no portfolio could be built.
         """
         if not start:
             start = "2022-01-01"
@@ -106,17 +130,22 @@ class PortfolioService:
             returns_map[sym] = ret
 
         returns_df = pd.DataFrame(returns_map).fillna(0.0)
-        final_symbols = list(filtered_dict.keys())
+        self._cache_returns(returns_df)
+        final_symbols = self._symbols
+        all_idx = list(range(len(final_symbols)))
 
         # Plot correlation
-        plotter = Plotter(style="whitegrid")
-        corr_matrix = returns_df.corr()
-        plotter.plot_correlation_heatmap(corr_matrix, title="Correlation Matrix of Selected Assets")
+        plotter = Plotter(style="whitegrid") if plot else None
+        if plotter is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                corr = self._Sigma / np.outer(self._std, self._std)
+            corr_matrix = pd.DataFrame(corr, index=final_symbols, columns=final_symbols)
+            plotter.plot_correlation_heatmap(corr_matrix, title="Correlation Matrix of Selected Assets")
 
         # If user wants best subset with eq weights
         if equal_weights:
             print("[INFO] Finding best subset under equal weights.")
-            best_subset = self._generate_equal_weights_best_subset(returns_df, final_symbols)
+            best_subset = self._generate_equal_weights_best_subset(all_idx)
             if not best_subset or len(best_subset) == 0:
                 print("[WARN] No subset found for equal weights.")
                 return
@@ -126,22 +155,24 @@ class PortfolioService:
                 # Chose a criterion to limit the subset
                 # for example, by average returns
                 print(f"[INFO] best_subset has {len(best_subset)} assets, limiting to {max_darwins} by average returns.")
-                mean_map = {}
-                for sym in best_subset:
-                    mean_map[sym] = returns_df[sym].mean()
+                mean_map = dict(zip(best_subset, self._R[:, best_subset].mean(axis=0)))
                 # Order by mean return
-                sorted_symbols = sorted(best_subset, key=lambda s: mean_map[s], reverse=True)
-                best_subset = sorted_symbols[:max_darwins]
+                sorted_idx = sorted(best_subset, key=lambda i: mean_map[i], reverse=True)
+                best_subset = sorted_idx[:max_darwins]
 
-            print(f"[INFO] Final subset for eq-wgts: {best_subset}")
+            print(f"[INFO] Final subset for eq-wgts: {[self._symbols[i] for i in best_subset]}")
             eq_w = np.ones(len(best_subset)) / len(best_subset)
-            self._evaluate_and_plot_single_portfolio(
-                eq_w, best_subset, returns_df, mc, plotter, plot_individual, tag="Best Equal-Weights Subset"
+            tag = "Best Equal-Weights Subset"
+            metrics = self._evaluate_and_plot_single_portfolio(
+                eq_w, best_subset, mc, plotter if plot_top_k > 0 else None, plot_individual, tag
             )
-            return
+            return {
+                "symbols": final_symbols,
+                "portfolios": [{"tag": tag, "weights": self._weights_by_symbol(eq_w, best_subset), "metrics": metrics}],
+            }
 
         # Otherwise do distinct optimization
-        best_portfolios = self._optimize_distinct_portfolios(returns_df, final_symbols, num_portfolios)
+        best_portfolios = self._optimize_distinct_portfolios(all_idx, num_portfolios)
         if len(best_portfolios) == 0:
             print("[WARN] No distinct portfolios found.")
             return
@@ -180,169 +211,203 @@ class PortfolioService:
                 print(f"    {d}: {wval*100:.2f}%")
             print("")
 
+        # The reductions shared by all portfolios run once on the (P, T) matrix
+        batch = self._batch_metrics(np.array([w for _, w in best_portfolios]), all_idx, mc)
+
+        results = []
         for i, (sharpe_val, w) in enumerate(best_portfolios, start=1):
             tag = f"Portfolio #{i} (Sharpe ~ {sharpe_val:.2f})"
-            self._evaluate_and_plot_single_portfolio(w, final_symbols, returns_df, mc, plotter, plot_individual, tag)
+            metrics = self._evaluate_and_plot_single_portfolio(
+                w, all_idx, mc, plotter if i <= plot_top_k else None, plot_individual, tag,
+                batch_metrics={name: float(values[i - 1]) for name, values in batch.items()}
+            )
+            results.append({"tag": tag, "weights": self._weights_by_symbol(w, all_idx), "metrics": metrics})
+        return {"symbols": final_symbols, "portfolios": results}
+
+    def _weights_by_symbol(self, weights, indices):
+        """
+        Map a weights vector back to symbol names.
+
+        :param weights: array of weights, ordered like indices
+        :param indices: list of column indices into the cached returns matrix
+        :return: dict {symbol: weight}
+        """
+        return {self._symbols[i]: float(w) for i, w in zip(indices, weights)}
+
+    def _cache_returns(self, returns_df):
+        """
+        Cache the daily returns as a C-contiguous float64 matrix so the helpers below
+        slice columns by index instead of re-indexing the DataFrame on every call.
+        The mean vector and sample covariance (ddof=1) are computed here once and shared
+        by the correlation plot, the warm start and the optimizers.
+
+        :param returns_df: DataFrame of daily returns, one column per symbol.
+        """
+        self._symbols = list(returns_df.columns)
+        self._dates = returns_df.index
+        self._R = np.ascontiguousarray(returns_df.to_numpy(dtype=np.float64))
 
-    def _optimize_distinct_portfolios(self, returns_df, symbols, num_portfolios):
+        self._mu = self._R.mean(axis=0)
+        centered = self._R - self._mu
+        self._Sigma = centered.T @ centered / max(len(self._R) - 1, 1)
+        self._std = np.sqrt(np.diag(self._Sigma))
+
+    def _optimize_distinct_portfolios(self, indices, num_portfolios):
         """
-        Multiple random restarts to find distinct sets with sum(weights)=1,
-        bounds in [1/(2N), 2/N], and no fees. Leverage is stored in self.leverage.
+        Find distinct sets with sum(weights)=1, bounds in [1/(2N), 2/N], and no fees.
+        Leverage is stored in self.leverage. Candidates come from a mean-variance frontier
+        sweep when cvxpy is installed, otherwise from SLSQP random restarts.
 
-        :param returns_df: DataFrame of daily returns.
-        :param symbols: List of symbols.
+        :param indices: list of column indices into the cached returns matrix.
         :param num_portfolios: Number of solutions to keep.
-        :return: list of (sharpe_val, weights_array).
+        :return: list of (sharpe_val, weights_array), weights ordered like indices.
         """
-        n_assets = len(symbols)
+        n_assets = len(indices)
         if n_assets < 1:
             return []
 
-        from src.optimization.constraints import get_exposure_bounds
         bounds = get_exposure_bounds(n_assets)
-        constraints = [{"type": "eq", "fun": lambda w: np.sum(w) - 1.0}]
 
-        def objective(weights):
-            daily_port = (returns_df[symbols] * weights).sum(axis=1)
-            daily_net = daily_port * self.leverage  # no fees
-            mean_ret = daily_net.mean() * 252
-            std_ret = daily_net.std() * np.sqrt(252)
-            if std_ret == 0:
-                return 1e6
-            return -(mean_ret / std_ret)
+        mu = self._mu[indices]
+        sigma = self._Sigma[np.ix_(indices, indices)]
+        if HAS_CVXPY:
+            results = _frontier_sweep(mu, sigma, bounds, self.leverage)
+        else:
+            results = self._random_restarts(mu, sigma, bounds, num_portfolios * self.max_random_tries_factor)
+
+        # Best first, so each active set keeps its highest-Sharpe representative
+        results = sorted((r for r in results if r is not None), key=lambda x: x[0], reverse=True)
+
+        # Active sets are hashed as a uint64 bitmask (one bit per asset), or as packed
+        # bytes when there are more than 64 assets
+        powers = np.uint64(1) << np.arange(n_assets, dtype=np.uint64) if n_assets <= 64 else None
 
         best_portfolios = []
         seen_sets = set()
-        tries = num_portfolios * self.max_random_tries_factor
-
-        for _ in range(tries):
-            w0 = []
-            for (mn, mx) in bounds:
-                val = np.random.uniform(mn, mx)
-                w0.append(val)
-            w0 = np.array(w0)
-            w0 /= w0.sum()
-
-            res = minimize(objective, w0, method="SLSQP", bounds=bounds, constraints=constraints)
-            if not res.success:
-                continue
-
-            est_sharpe = -res.fun
-            w = res.x
-            active_set = frozenset([symbols[i] for i, v in enumerate(w) if v > 1e-4])
+        for est_sharpe, w in results:
+            active = w > 1e-4
+            if powers is not None:
+                active_set = int(active.astype(np.uint64) @ powers)
+            else:
+                active_set = np.packbits(active).tobytes()
             if active_set not in seen_sets:
                 best_portfolios.append((est_sharpe, w))
                 seen_sets.add(active_set)
 
-        best_portfolios.sort(key=lambda x: x[0], reverse=True)
         return best_portfolios[:num_portfolios]
 
-    def _generate_equal_weights_best_subset(self, returns_df, symbols):
+    def _random_restarts(self, mu, sigma, bounds, tries):
+        """
+        Run `tries` SLSQP max-Sharpe restarts across CPU cores.
+
+        :param mu: mean daily return per asset.
+        :param sigma: sample covariance matrix of the daily returns.
+        :param bounds: list of (min_w, max_w) per asset.
+        :param tries: number of restarts.
+        :return: list of (sharpe_val, weights_array) or None per restart.
+        """
+        # One child SeedSequence per restart: each worker builds its own Generator from it,
+        # so the streams are independent and reproducible regardless of how they are scheduled.
+        seeds = np.random.SeedSequence(self.seed).spawn(tries)
+
+        # Warm start from the unconstrained tangency portfolio: the first restart starts
+        # exactly there (clipped into bounds), the others from small perturbations of it.
+        w_tan = _tangency_weights(mu, sigma, self.leverage)
+        scales = np.full(tries, 0.05)
+        scales[0] = 0.0
+
+        # Restarts are independent, so run them across CPU cores. The objective only needs
+        # the first two moments, so workers receive mu and Sigma (N + N^2 floats), not R.
+        max_workers = os.cpu_count() or 1
+        chunksize = max(1, tries // (8 * max_workers))
+        restart = partial(_single_restart, mu=mu, sigma=sigma, bounds=bounds, leverage=self.leverage, w_start=w_tan)
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            return list(ex.map(restart, seeds, scales, chunksize=chunksize))
+
+    def _generate_equal_weights_best_subset(self, indices):
         """
         Finds best subset for eq-wgts. If #assets <=15, brute force. Else use backward elimination.
 
-        :param returns_df: daily returns DataFrame
-        :param symbols: list of symbols
-        :return: list of chosen symbols
+        :param indices: list of column indices into the cached returns matrix
+        :return: list of chosen column indices
         """
-        M = len(symbols)
+        M = len(indices)
         if M < 1:
             return []
 
         if M <= 15:
-            return self._eq_subset_bruteforce(returns_df, symbols)
+            return self._eq_subset_bruteforce(indices)
         else:
-            return self._eq_subset_backward_elimination(returns_df, symbols)
+            return self._eq_subset_backward_elimination(indices)
 
-    def _eq_subset_bruteforce(self, returns_df, symbols):
+    def _eq_subset_bruteforce(self, indices):
         """
         Enumerate subsets, no fees, just leverage.
 
-        :param returns_df: DataFrame
-        :param symbols: list
-        :return: best subset
+        :param indices: list of column indices into the cached returns matrix
+        :return: best subset as column indices
         """
-        from itertools import combinations
-
-        best_sharpe = float("-inf")
-        best_subset = []
-
-        def compute_sharpe(sub):
-            if not sub:
-                return None
-            w = 1.0 / len(sub)
-            daily_port = returns_df[sub].sum(axis=1) * w
-            daily_net = daily_port * self.leverage
-            mean_ret = daily_net.mean() * 252
-            std_ret = daily_net.std() * np.sqrt(252)
-            if std_ret == 0:
-                return None
-            return mean_ret / std_ret
-
-        for size in range(1, len(symbols)+1):
-            for combo in combinations(symbols, size):
-                subset_sym = list(combo)
-                shr = compute_sharpe(subset_sym)
-                if shr is not None and shr > best_sharpe:
-                    best_sharpe = shr
-                    best_subset = subset_sym
-        return best_subset
-
-    def _eq_subset_backward_elimination(self, returns_df, symbols):
+        R = np.asfortranarray(self._R[:, indices])
+        best_mask = eq_subset_gray_search(R, float(self.leverage))
+        return [indices[j] for j in range(len(indices)) if best_mask >> j & 1]
+
+    def _eq_subset_backward_elimination(self, indices):
         """
         Start with all, remove one asset if it improves Sharpe, until no improvement.
-        :param returns_df: DataFrame
-        :param symbols: list
-        :return: final subset
+        :param indices: list of column indices into the cached returns matrix
+        :return: final subset as column indices
         """
-        current_set = list(symbols)
-
-        def eq_sharpe(sub):
-            if len(sub) < 1:
-                return float("-inf")
-            w = 1.0 / len(sub)
-            daily_port = returns_df[sub].sum(axis=1) * w
-            daily_net = daily_port * self.leverage
-            mean_ret = daily_net.mean() * 252
-            std_ret = daily_net.std() * np.sqrt(252)
-            if std_ret == 0:
-                return float("-inf")
-            return mean_ret / std_ret
-
-        best_val = eq_sharpe(current_set)
-        improved = True
-        while improved and len(current_set) > 1:
-            improved = False
-            for sym in current_set:
-                trial = [x for x in current_set if x != sym]
-                test_val = eq_sharpe(trial)
-                if test_val > best_val:
-                    best_val = test_val
-                    current_set = trial
-                    improved = True
-                    break
-        return current_set
-
-    def _evaluate_and_plot_single_portfolio(self, weights, symbols, returns_df, mc, plotter, plot_individual, tag):
+        R = np.asfortranarray(self._R[:, indices])
+        active = eq_subset_backward_elimination(R, float(self.leverage))
+        return [indices[j] for j in np.flatnonzero(active)]
+
+    def _batch_metrics(self, weights_matrix, indices, mc):
+        """
+        Sharpe, Sortino and max drawdown of several portfolios in one vectorized pass each.
+
+        :param weights_matrix: 2-D array (P, N) of weights, one row per portfolio, columns ordered like indices
+        :param indices: list of column indices into the cached returns matrix
+        :param mc: MetricsCalculator
+        :return: dict {"sharpe", "sortino", "max_drawdown"} of np.ndarray (P,)
+        """
+        daily_net = self._R[:, indices] @ weights_matrix.T
+        daily_net *= self.leverage
+        equity = _equity_curve(daily_net)
+        return {
+            "sharpe": mc.sharpe_ratio_batch(daily_net.T),
+            "sortino": mc.sortino_ratio_batch(daily_net.T),
+            "max_drawdown": mc.max_drawdown_batch(equity.T),
+        }
+
+    def _evaluate_and_plot_single_portfolio(
+        self, weights, indices, mc, plotter, plot_individual, tag, batch_metrics=None
+    ):
         """
         Build daily net with leverage (no fees), compute metrics, plot equity.
 
-        :param weights: array of weights
-        :param symbols: list of symbols
-        :param returns_df: daily returns
+        :param weights: array of weights, ordered like indices
+        :param indices: list of column indices into the cached returns matrix
         :param mc: MetricsCalculator
-        :param plotter: Plotter
+        :param plotter: Plotter, or None to skip plotting
         :param plot_individual: bool
         :param tag: str for print/plot
+        :param batch_metrics: optional {"sharpe", "sortino", "max_drawdown"} already computed by _batch_metrics
+        :return: dict of the computed metrics
         """
-        daily_port = (returns_df[symbols] * weights).sum(axis=1)
-        daily_net = daily_port * self.leverage
-        equity = (1 + daily_net).cumprod() * 100
-
-        p_sharpe = mc.sharpe_ratio(daily_net)
-        p_sortino = mc.sortino_ratio(daily_net)
-        p_return = equity.iloc[-1] / equity.iloc[0] - 1
-        p_mdd = mc.max_drawdown(equity)
+        R = self._R[:, indices]
+        daily_net = R @ weights
+        daily_net *= self.leverage
+        equity = _equity_curve(daily_net)
+
+        if batch_metrics is not None:
+            p_sharpe = batch_metrics["sharpe"]
+            p_sortino = batch_metrics["sortino"]
+            p_mdd = batch_metrics["max_drawdown"]
+        else:
+            p_sharpe = mc.sharpe_ratio(daily_net)
+            p_sortino = mc.sortino_ratio(daily_net)
+            p_mdd = mc.max_drawdown(equity)
+        p_return = equity[-1] / equity[0] - 1
         p_dd_days = mc.longest_drawdown_period(equity)
         p_calmar = mc.calmar_ratio(equity)
         p_omega = mc.omega_ratio(daily_net)
@@ -357,15 +422,28 @@ class PortfolioService:
         print(f"  Omega Ratio       : {p_omega:.3f}")
         print("")
 
-        plotter.plot_portfolio_evolution(equity, title=tag)
+        metrics = {
+            "sharpe": p_sharpe,
+            "sortino": p_sortino,
+            "max_drawdown": p_mdd,
+            "total_return": float(p_return),
+            "longest_dd_days": p_dd_days,
+            "calmar": p_calmar,
+            "omega": p_omega,
+        }
+        if plotter is None:
+            return metrics
+
+        # pandas only for the plots, which need the date index
+        plotter.plot_portfolio_evolution(pd.Series(equity, index=self._dates), title=tag)
 
         if plot_individual:
-            eq_dict = {}
-            for d, wval in zip(symbols, weights):
-                indiv_ret = returns_df[d] * wval
-                indiv_net = indiv_ret * self.leverage
-                eq_dict[d] = (1 + indiv_net).cumprod() * 100
+            indiv = _equity_curve(R * (weights * self.leverage))
+            eq_dict = {
+                self._symbols[i]: pd.Series(indiv[:, j], index=self._dates) for j, i in enumerate(indices)
+            }
             plotter.plot_individual_equities(eq_dict)
+        return metrics
 
     def _resolve_darwins(self, darwins, start, end, save_path):
         """
@@ -384,15 +462,15 @@ class PortfolioService:
             print(f"[ERROR] Directory {save_path} does not exist.")
             return [], {}
 
-        csv_files = [f for f in os.listdir(save_path) if f.endswith(".csv")]
+        with os.scandir(save_path) as it:
+            csv_files = [e.name for e in it if e.name.endswith(".csv") and e.is_file()]
         if len(csv_files) == 0:
             print(f"[ERROR] No CSV files in {save_path}.")
             return [], {}
 
-        pattern = re.compile(r"^(?P<darwin>[A-Z0-9]+)_(\d{4}-\d{2}-\d{2})_(\d{4}-\d{2}-\d{2}).csv$")
         file_dict = {}
         for fname in csv_files:
-            match = pattern.match(fname)
+            match = _FILE_PATTERN.match(fname)
             if match:
                 dname = match.group("darwin")
                 file_dict.setdefault(dname, []).append(fname)
@@ -420,7 +498,7 @@ class PortfolioService:
         :param save_path: directory
         :return: dict {sym: price_series}
         """
-        quotes_dict = {}
+        paths = {}
         for d in darwins:
             if d in discovered_map:
                 chosen = discovered_map[d]
@@ -430,10 +508,13 @@ class PortfolioService:
             if not os.path.exists(full_path):
                 print(f"[WARN] File not found: {full_path}. Skipped {d}.")
                 continue
+            paths[d] = full_path
 
-            df = pd.read_csv(full_path, parse_dates=["date"], index_col="date").sort_index()
-            quotes_dict[d] = df["close"]
-        return quotes_dict
+        # pyarrow releases the GIL while parsing, so threads are enough to overlap the files
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) + 4)) as ex:
+            closes = ex.map(lambda path: _read_close(path, os.path.getmtime(path)), paths.values())
+            # Hand out copies: the cached series must not see the caller's edits
+            return {d: close.copy() for d, close in zip(paths.keys(), closes)}
 
     def _filter_assets(self, quotes_dict):
         """
@@ -442,17 +523,214 @@ class PortfolioService:
         :param quotes_dict: {sym: price_series}
         :return: filtered dict
         """
-        result = {}
-        for sym, series in quotes_dict.items():
-            if len(series) < 2:
-                continue
-            total_ret = (series.iloc[-1] / series.iloc[0]) - 1
-            if total_ret <= 0:
-                continue
-            first_date = series.index[0]
-            last_date = series.index[-1]
-            days_diff = (last_date - first_date).days
-            if days_diff < 365:
-                continue
-            result[sym] = series
-        return result
+        if len(quotes_dict) == 0:
+            return {}
+
+        # Align every symbol on one date index and test all of them in a single pass;
+        # concat can't align an index with repeated dates, so keep the last quote of each day
+        prices = pd.concat(
+            {sym: ser[~ser.index.duplicated(keep="last")] for sym, ser in quotes_dict.items()}, axis=1
+        ).astype(np.float64)
+        values = prices.to_numpy()
+        valid = ~np.isnan(values)
+        first = valid.argmax(axis=0)
+        last = len(values) - 1 - valid[::-1].argmax(axis=0)
+        cols = np.arange(values.shape[1])
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            total_ret = values[last, cols] / values[first, cols] - 1
+        days_diff = (prices.index[last] - prices.index[first]).days
+        keep = valid.any(axis=0) & (total_ret > 0) & (np.asarray(days_diff) >= 365)
+
+        return {sym: quotes_dict[sym] for sym, ok in zip(prices.columns, keep) if ok}
+
+def _equity_curve(daily_net):
+    """
+    Equity starting at 100, compounded in log space: 100 * exp(cumsum(log1p(r))).
+    Summing logs is more stable than a long product over many days.
+
+    :param daily_net: 1-D array (T,) or 2-D array (T, N) of daily returns, one column per curve.
+    :return: np.ndarray with the same shape, the cumulative equity along axis 0.
+    """
+    # A loss of 100% or more wipes the account out: clamp so log1p gives -inf (equity 0), not NaN
+    log_ret = np.maximum(daily_net, -1.0)
+    with np.errstate(divide="ignore"):
+        np.log1p(log_ret, out=log_ret)
+    equity = np.cumsum(log_ret, axis=0, out=log_ret)
+    np.exp(equity, out=equity)
+    equity *= 100
+    return equity
+
+@lru_cache(maxsize=512)
+def _read_close(path, mtime):
+    """
+    Parse the close prices of one CSV, indexed by date. Cached on (path, mtime), so repeated
+    runs in the same process (e.g. sweeping leverage) only re-read files that changed.
+
+    :param path: CSV file with at least 'date' and 'close' columns.
+    :param mtime: modification time of the file, only used as part of the cache key.
+    :return: pd.Series of close prices sorted by date, one per date (the last quote wins).
+    """
+    df = pd.read_csv(path, engine="pyarrow", usecols=["date", "close"], parse_dates=["date"]).set_index("date")
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind="stable")
+    if df.index.has_duplicates:
+        df = df[~df.index.duplicated(keep="last")]
+    return df["close"]
+
+def _tangency_weights(mu, sigma, leverage, risk_free_rate=0.0):
+    """
+    Closed-form max-Sharpe (tangency) weights w ~ pinv(Sigma) @ (mu - rf), ignoring bounds.
+
+    :param mu: mean daily return per asset.
+    :param sigma: covariance matrix of the daily returns.
+    :param leverage: leverage factor; only its sign matters for the Sharpe.
+    :param risk_free_rate: annual risk-free rate.
+    :return: weights summing to 1, or equal weights if the solution is degenerate.
+    """
+    n_assets = len(mu)
+    w_tan = np.linalg.pinv(sigma * 252) @ (mu * 252 * np.sign(leverage) - risk_free_rate)
+    total = w_tan.sum()
+    if not np.isfinite(total) or abs(total) < 1e-12:
+        return np.full(n_assets, 1.0 / n_assets)
+    return w_tan / total
+
+def _project_to_bounds(weights, lb, ub, n_iter=60):
+    """
+    Euclidean projection onto {lb <= w <= ub, sum(w) = 1}. The projection has the form
+    clip(w - tau, lb, ub) and its sum decreases with tau, so tau is found by bisection.
+    Assumes the set is non-empty, i.e. sum(lb) <= 1 <= sum(ub).
+
+    :param weights: 1-D array to project.
+    :param lb: lower bound per asset.
+    :param ub: upper bound per asset.
+    :param n_iter: bisection steps.
+    :return: the projected weights (the input itself if it is already feasible).
+    """
+    if np.all((weights >= lb) & (weights <= ub)) and abs(weights.sum() - 1.0) < 1e-12:
+        return weights
+    # At tau = lo every weight sits at its upper bound (sum >= 1), at tau = hi at its lower bound
+    lo = (weights - ub).min()
+    hi = (weights - lb).max()
+    for _ in range(n_iter):
+        tau = 0.5 * (lo + hi)
+        if np.clip(weights - tau, lb, ub).sum() > 1.0:
+            lo = tau
+        else:
+            hi = tau
+    return np.clip(weights - 0.5 * (lo + hi), lb, ub)
+
+def _max_sharpe_qp(mu, sigma, lb, ub):
+    """
+    Exact bounded max-Sharpe portfolio as one QP (Charnes-Cooper homogenization): with
+    y = kappa * w, minimize y@Sigma@y s.t. mu@y = 1, sum(y) = kappa, lb*kappa <= y <= ub*kappa.
+
+    :param mu: mean daily return per asset (already multiplied by the leverage sign).
+    :param sigma: covariance matrix of the daily returns.
+    :param lb: lower bound per asset.
+    :param ub: upper bound per asset.
+    :return: weights summing to 1, or None if no feasible portfolio has a positive mean.
+    """
+    y = cp.Variable(len(mu))
+    kappa = cp.Variable(nonneg=True)
+    problem = cp.Problem(
+        cp.Minimize(cp.quad_form(y, cp.psd_wrap(sigma))),
+        [mu @ y == 1, cp.sum(y) == kappa, y >= lb * kappa, y <= ub * kappa],
+    )
+    try:
+        # Interior point rather than OSQP: the ratio is sensitive to the solver tolerance
+        problem.solve(solver=cp.CLARABEL)
+    except cp.error.SolverError:
+        return None
+    if y.value is None or kappa.value is None or kappa.value <= 0:
+        return None
+    return y.value / kappa.value
+
+def _frontier_sweep(mu, sigma, bounds, leverage, gammas=None):
+    """
+    Trace the bounded mean-variance frontier max mu@w - gamma * w@Sigma@w over a grid of
+    risk aversions. The problem is built once and re-solved with a new gamma each time,
+    so OSQP warm-starts from the previous solution and reuses its factorization.
+    The exact max-Sharpe portfolio is added as a candidate, since a grid can only get close to it.
+
+    :param mu: mean daily return per asset.
+    :param sigma: sample covariance matrix of the daily returns.
+    :param bounds: list of (min_w, max_w) per asset.
+    :param leverage: leverage factor; only its sign matters for the Sharpe.
+    :param gammas: risk aversion grid, defaults to 50 points over four decades around the
+                   risk aversion at which equal weights would be the tangency portfolio.
+    :return: list of (sharpe_val, weights_array), one per solved gamma plus the exact optimum.
+    """
+    n_assets = len(mu)
+    lb, ub = np.array(bounds).T
+    lev_sign = np.sign(leverage)
+    mu_ann = mu * 252 * lev_sign
+    sigma_ann = sigma * 252
+
+    if gammas is None:
+        # On the bounded frontier the tangency point has gamma = mu@w / (2 w@Sigma@w), so
+        # centre the grid on that value for equal weights instead of on fixed units
+        w_eq = np.full(n_assets, 1.0 / n_assets)
+        var_eq = w_eq @ sigma_ann @ w_eq
+        gamma_eq = abs(mu_ann @ w_eq) / (2 * var_eq) if var_eq > 0 else 1.0
+        gammas = np.logspace(-2, 2, 50) * (gamma_eq if gamma_eq > 0 else 1.0)
+
+    w = cp.Variable(n_assets)
+    gamma = cp.Parameter(nonneg=True)
+    problem = cp.Problem(
+        cp.Maximize(mu_ann @ w - gamma * cp.quad_form(w, cp.psd_wrap(sigma_ann))),
+        [cp.sum(w) == 1, w >= lb, w <= ub],
+    )
+
+    candidates = []
+    for g in gammas:
+        gamma.value = g
+        try:
+            problem.solve(solver=cp.OSQP, warm_start=True)
+        except cp.error.SolverError:
+            continue
+        if w.value is not None:
+            candidates.append(w.value)
+    w_best = _max_sharpe_qp(mu_ann, sigma_ann, lb, ub)
+    if w_best is not None:
+        candidates.append(w_best)
+
+    results = []
+    for weights in candidates:
+        # Solvers are only accurate to their tolerance: snap back into the feasible set
+        weights = _project_to_bounds(weights, lb, ub)
+        std_ret = np.sqrt(weights @ sigma @ weights)
+        if std_ret == 0:
+            continue
+        results.append((lev_sign * np.sqrt(252.0) * (mu @ weights) / std_ret, weights))
+    return results
+
+def _single_restart(seed, scale, mu, sigma, bounds, leverage, w_start):
+    """
+    Run one SLSQP max-Sharpe optimization starting from a perturbation of w_start.
+    Module-level so it can be dispatched to a worker process.
+
+    :param seed: np.random.SeedSequence for the perturbation of this restart.
+    :param scale: std of the Gaussian noise added to w_start (0.0 = start at w_start).
+    :param mu: mean daily return per asset.
+    :param sigma: sample covariance matrix (ddof=1) of the daily returns.
+    :param bounds: list of (min_w, max_w) per asset.
+    :param leverage: leverage factor applied to daily returns.
+    :param w_start: warm start weights, typically the tangency portfolio.
+    :return: (sharpe_val, weights_array), or None if the optimization failed.
+    """
+    rng = np.random.default_rng(seed)
+    lb, ub = np.array(bounds).T
+    # Start SLSQP from a feasible point so it doesn't spend iterations getting back into bounds
+    init_weights = _project_to_bounds(w_start + rng.normal(scale=scale, size=w_start.size), lb, ub)
+
+    # Leverage scales mean and std alike (no fees), so only its sign survives in the Sharpe
+    lev_sign = float(np.sign(leverage))
+    args = (np.ascontiguousarray(mu, dtype=np.float64), np.ascontiguousarray(sigma, dtype=np.float64), lev_sign)
+
+    res = minimize(
+        neg_sharpe_and_grad, init_weights, args=args, method="SLSQP", jac=True, bounds=bounds, constraints=SUM_TO_ONE
+    )
+    if not res.success:
+        return None
+    return -res.fun, res.x
@@ -1,16 +1,22 @@
 """
 test_data_fetcher.py
-Tests for data fetching. We mock requests to avoid calling Darwinex API.
+Tests for data fetching. We mock the HTTP session to avoid calling Darwinex API.
 """
 
+import io
+import json
+import time
 import pytest
+import pandas as pd
 from unittest.mock import patch
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
 from src.data_fetcher.info_api_client import DarwinexInfoAPIClient
 from src.data_fetcher.data_service import DataService
 import os
 
-@patch("src.data_fetcher.info_api_client.requests.get")
-def test_get_quotes_success(mock_get):
+@patch("src.data_fetcher.info_api_client.CachedSession.get")
+def test_get_quotes_success(mock_get, tmp_path):
     """
     Test successful get_quotes with a mocked HTTP 200 response.
     """
@@ -19,20 +25,27 @@ def test_get_quotes_success(mock_get):
         [1692400000000, 123.4],
         [1692486400000, 124.1]
     ]
-    client = DarwinexInfoAPIClient(api_key="FAKE_KEY")
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
     data = client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
     assert len(data) == 2
     assert data[0] == [1692400000000, 123.4]
 
-def test_data_service_init():
+def test_client_session_reused(tmp_path):
+    """
+    The bearer token is set once on the persistent session used as a context manager.
+    """
+    with DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache")) as client:
+        assert client.session.headers["Authorization"] == "Bearer FAKE_KEY"
+
+def test_data_service_init(tmp_path):
     """
     Ensure data service can be initialized with a mock API client.
     """
-    client = DarwinexInfoAPIClient(api_key="FAKE_KEY")
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
     ds = DataService(client)
     assert ds.api_client.api_key == "FAKE_KEY"
 
-@patch("src.data_fetcher.info_api_client.requests.get")
+@patch("src.data_fetcher.info_api_client.CachedSession.get")
 def test_fetch_and_save_quotes(mock_get, tmp_path):
     """
     Test fetch_and_save_quotes writes a CSV for each product.
@@ -43,7 +56,7 @@ def test_fetch_and_save_quotes(mock_get, tmp_path):
         [1692486400000, 101.0]
     ]
 
-    client = DarwinexInfoAPIClient(api_key="FAKE_KEY")
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
     ds = DataService(client)
     out_dir = tmp_path / "raw"
     ds.fetch_and_save_quotes(["PXQ"], "2022-01-01", "2022-01-02", save_path=str(out_dir))
@@ -51,7 +64,192 @@ def test_fetch_and_save_quotes(mock_get, tmp_path):
     # Check file existence
     files = list(out_dir.glob("*.csv"))
     assert len(files) == 1
-    with files[0].open() as f:
+    df = pd.read_csv(files[0], parse_dates=["date"])
+    assert list(df.columns) == ["date", "close"]
+    assert df["close"].tolist() == [100.0, 101.0]
+
+@patch("src.data_fetcher.info_api_client.CachedSession.get")
+def test_fetch_and_save_quotes_concurrent(mock_get, tmp_path, monkeypatch):
+    """
+    Several products downloaded concurrently each get their own CSV.
+    """
+    monkeypatch.setenv("DARWINEX_THROTTLING_SECONDS", "0")
+    monkeypatch.setenv("DARWINEX_MAX_CONCURRENCY", "2")
+    mock_get.return_value.status_code = 200
+    mock_get.return_value.json.return_value = [
+        [1692400000000, 100.0],
+        [1692486400000, 101.0]
+    ]
+
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
+    ds = DataService(client)
+    out_dir = tmp_path / "raw"
+    ds.fetch_and_save_quotes(["PXQ", "JBC", "YZZ"], "2022-01-01", "2022-01-02", save_path=str(out_dir))
+
+    files = sorted(f.name for f in out_dir.glob("*.csv"))
+    assert files == [
+        "JBC_2022-01-01_2022-01-02.csv",
+        "PXQ_2022-01-01_2022-01-02.csv",
+        "YZZ_2022-01-01_2022-01-02.csv",
+    ]
+    assert mock_get.call_count == 3
+
+class _FakeQuotesAdapter(HTTPAdapter):
+    """
+    Transport adapter answering every request with one quote, so responses go through the real cache.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        body = json.dumps([[1640995200000, 100.0]]).encode()
+        raw = HTTPResponse(
+            body=io.BytesIO(body), headers={"Content-Type": "application/json"}, status=200,
+            preload_content=False, request_url=request.url
+        )
+        return self.build_response(request, raw)
+
+def test_is_cached(tmp_path):
+    """
+    A fresh cache reports no stored quotes.
+    """
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
+    assert client.is_cached("PXQ", "2022-01-01", "2022-01-02") is False
+
+def test_is_cached_after_download(tmp_path):
+    """
+    Downloaded quotes are reported as cached and served without another HTTP call.
+    """
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
+    adapter = _FakeQuotesAdapter()
+    client.session.mount("https://", adapter)
+
+    client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
+    assert client.is_cached("PXQ", "2022-01-01", "2022-01-02") is True
+    client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
+    assert adapter.calls == 1
+
+def test_is_cached_false_once_expired(tmp_path):
+    """
+    Expired responses stay in the backend but must not count as cached, since they hit the API again.
+    """
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"), expire_after=1)
+    adapter = _FakeQuotesAdapter()
+    client.session.mount("https://", adapter)
+
+    client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
+    time.sleep(1.5)
+    assert client.is_cached("PXQ", "2022-01-01", "2022-01-02") is False
+    client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
+    assert adapter.calls == 2
+
+def test_sessions_per_thread_share_cache(tmp_path):
+    """
+    Each thread gets its own session, all reading the same disk cache, and close() closes them all.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
+    client.session.mount("https://", _FakeQuotesAdapter())
+    client.get_quotes("PXQ", "2022-01-01", "2022-01-02")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        worker_session = pool.submit(lambda: client.session).result()
+        assert pool.submit(client.is_cached, "PXQ", "2022-01-01", "2022-01-02").result() is True
+    assert worker_session is not client.session
+    assert worker_session.headers["Authorization"] == "Bearer FAKE_KEY"
+
+    with patch("src.data_fetcher.info_api_client.CachedSession.close") as mock_close:
+        client.close()
+    assert mock_close.call_count == 2
+
+def test_apply_fee_process():
+    """
+    Positive daily returns are reduced by the fee rate, negative ones are kept.
+    """
+    from src.data_fetcher.fees_preprocessor import FeesPreprocessor
+
+    df = pd.DataFrame({
+        "date": pd.date_range("2022-01-01", periods=4, freq="D", tz="UTC"),
+        "close": [100.0, 110.0, 99.0, 108.9]
+    })
+    fp = FeesPreprocessor(fee_rate=0.2)
+    out = fp._apply_fee_process(df)
+
+    # +10% => +8%, -10% => -10%, +10% => +8%
+    expected = [100.0, 108.0, 97.2, 104.976]
+    assert list(out.columns) == ["date", "close"]
+    assert out["close"].tolist() == pytest.approx(expected)
+    assert (out["date"] == df["date"]).all()
+
+def test_apply_fee_process_empty(tmp_path):
+    """
+    An empty frame comes back empty, and a header-only CSV is skipped with a warning.
+    """
+    from src.data_fetcher.fees_preprocessor import FeesPreprocessor, _process_one
+
+    df = pd.DataFrame({"date": pd.to_datetime([]), "close": pd.Series([], dtype=float)})
+    out = FeesPreprocessor(fee_rate=0.2)._apply_fee_process(df)
+    assert list(out.columns) == ["date", "close"]
+    assert len(out) == 0
+
+    in_path = tmp_path / "PXQ_2022-01-01_2022-01-02.csv"
+    in_path.write_text("date,close\n")
+    out_path = tmp_path / "out.csv"
+    assert _process_one((str(in_path), str(out_path), 0.2)).startswith("[WARN]")
+    assert not out_path.exists()
+
+def test_process_all_files(tmp_path):
+    """
+    Every raw CSV gets a fees-adjusted counterpart with the same filename.
+    """
+    from src.data_fetcher.fees_preprocessor import FeesPreprocessor
+
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    (raw_dir / "PXQ_2022-01-01_2022-01-03.csv").write_text(
+        "date,close\n2022-01-01,100.0\n2022-01-02,110.0\n2022-01-03,99.0\n"
+    )
+    (raw_dir / "JBC_2022-01-01_2022-01-01.csv").write_text("date,close\n2022-01-01,100.0\n")
+
+    out_dir = tmp_path / "processed"
+    FeesPreprocessor(fee_rate=0.2).process_all_files(str(raw_dir), str(out_dir))
+
+    files = sorted(f.name for f in out_dir.glob("*.csv"))
+    assert files == ["PXQ_2022-01-01_2022-01-03.csv"]
+    with (out_dir / files[0]).open() as f:
         content = f.read()
-        assert "100.0" in content
-        assert "101.0" in content
+        assert "108.0" in content
+
+def test_fee_kernel_matches_numpy():
+    """
+    The numba kernel and the NumPy fallback produce the same prices.
+    """
+    import numpy as np
+    from src.data_fetcher.fees_preprocessor import _apply_fees_kernel, _apply_fees_numpy
+
+    rng = np.random.default_rng(0)
+    close = 100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.01, 500))
+    out_kernel = np.empty_like(close)
+    out_numpy = np.empty_like(close)
+    _apply_fees_kernel(close, 0.2, out_kernel)
+    _apply_fees_numpy(close, 0.2, out_numpy)
+    assert np.allclose(out_kernel, out_numpy)
+
+def test_convert_to_table_sorts_unordered(tmp_path):
+    """
+    Quotes are returned in chronological order even if the API sends them unordered.
+    """
+    client = DarwinexInfoAPIClient(api_key="FAKE_KEY", cache_name=str(tmp_path / "cache"))
+    ds = DataService(client)
+    table = ds._convert_to_table([
+        [1692486400000, 101.0],
+        [1692400000000, 100.0]
+    ])
+    assert table.column_names == ["date", "close"]
+    assert table.column("close").to_pylist() == [100.0, 101.0]
+    df = table.to_pandas()
+    assert df["date"].is_monotonic_increasing
@@ -10,11 +10,21 @@ from src.analysis.metrics_calculator import MetricsCalculator
 def test_sharpe_ratio_constant_returns():
     """
     Test Sharpe ratio with constant daily returns of 0.1%.
+    Zero volatility is short-circuited to 0.0, like any zero std.
     """
     mc = MetricsCalculator(risk_free_rate=0.0)
     data = pd.Series([0.001]*252)
+    assert mc.sharpe_ratio(data) == 0.0
+    assert mc.sortino_ratio(data) == 0.0
+
+def test_sharpe_ratio_nearly_constant_returns():
+    """
+    Test Sharpe ratio with daily returns of 0.1% and a tiny wobble.
+    """
+    mc = MetricsCalculator(risk_free_rate=0.0)
+    data = pd.Series([0.001, 0.0011] * 126)
     sr = mc.sharpe_ratio(data)
-    assert sr > 10  # Should be very high for constant returns
+    assert sr > 10  # Should be very high for almost constant returns
 
 def test_max_drawdown():
     """
@@ -45,3 +55,109 @@ def test_omega_ratio_above_threshold():
     omega = mc.omega_ratio(data, threshold=0.0)
     # Expect more positive than negative sum
     assert omega > 1
+
+def test_longest_drawdown_period():
+    """
+    Longest run of consecutive days below the running peak.
+    """
+    mc = MetricsCalculator()
+    eq = pd.Series([100, 90, 95, 101, 99, 98, 97, 100, 102, 101])
+    # 99, 98, 97, 100 are all below the 101 peak => 4 days
+    assert mc.longest_drawdown_period(eq) == 4
+    assert mc.longest_drawdown_period(pd.Series([100, 101, 102])) == 0
+
+def test_longest_drawdown_kernel_matches_numpy(monkeypatch):
+    """
+    The numba scan and the NumPy run-length fallback agree on random equity curves.
+    """
+    import numpy as np
+    import src.analysis.metrics_calculator as mc_module
+
+    rng = np.random.default_rng(0)
+    mc = MetricsCalculator()
+    curves = [100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.01, 500)) for _ in range(5)]
+    kernel = [mc.longest_drawdown_period(eq) for eq in curves]
+    monkeypatch.setattr(mc_module, "HAS_NUMBA", False)
+    fallback = [mc.longest_drawdown_period(eq) for eq in curves]
+    assert kernel == fallback
+
+def test_return_kernels_match_numpy(monkeypatch):
+    """
+    The numba Sharpe/Sortino/Omega kernels agree with the NumPy fallback.
+    """
+    import numpy as np
+    import src.analysis.metrics_calculator as mc_module
+
+    rng = np.random.default_rng(1)
+    series = [rng.normal(0.0005, 0.01, 400) for _ in range(3)] + [np.full(10, 0.01), np.array([0.01, -0.02])]
+    for dtype in (np.float64, np.float32):
+        mc = MetricsCalculator(risk_free_rate=0.02, dtype=dtype)
+        kernel = [(mc.sharpe_ratio(r), mc.sortino_ratio(r), mc.omega_ratio(r)) for r in series]
+        monkeypatch.setattr(mc_module, "HAS_NUMBA", False)
+        fallback = [(mc.sharpe_ratio(r), mc.sortino_ratio(r), mc.omega_ratio(r)) for r in series]
+        monkeypatch.setattr(mc_module, "HAS_NUMBA", True)
+        np.testing.assert_allclose(kernel, fallback, rtol=1e-4)
+
+def test_kernels_match_numpy_with_nan(monkeypatch):
+    """
+    The numba kernels and the NumPy fallback agree on series containing NaN, wherever it sits.
+    """
+    import numpy as np
+    import src.analysis.metrics_calculator as mc_module
+
+    rng = np.random.default_rng(2)
+    base = rng.normal(0.0005, 0.01, 50)
+    series = [np.array([0.01, np.nan, 0.01]), np.array([np.nan, 0.01, -0.02, -0.01]), np.array([0.02, np.nan])]
+    for pos in (0, 25, 49):
+        r = base.copy()
+        r[pos] = np.nan
+        series.append(r)
+    mc = MetricsCalculator(risk_free_rate=0.02)
+
+    def all_metrics():
+        return [
+            (mc.sharpe_ratio(r), mc.sortino_ratio(r), mc.omega_ratio(r),
+             mc.longest_drawdown_period(100.0 * np.cumprod(1.0 + r)))
+            for r in series
+        ]
+
+    kernel = all_metrics()
+    monkeypatch.setattr(mc_module, "HAS_NUMBA", False)
+    fallback = all_metrics()
+    np.testing.assert_allclose(kernel, fallback, rtol=1e-12)
+
+def test_batch_metrics_match_single():
+    """
+    Batched metrics on a (P, T) matrix agree with the per-Series versions.
+    """
+    import numpy as np
+
+    mc = MetricsCalculator(risk_free_rate=0.01)
+    rng = np.random.default_rng(3)
+    R = 0.0005 + rng.normal(0, 0.01, size=(4, 300))
+    E = np.cumprod(1 + R, axis=1) * 100
+
+    sharpe = mc.sharpe_ratio_batch(R)
+    sortino = mc.sortino_ratio_batch(R)
+    mdd = mc.max_drawdown_batch(E)
+    for p in range(R.shape[0]):
+        assert sharpe[p] == pytest.approx(mc.sharpe_ratio(pd.Series(R[p])))
+        assert sortino[p] == pytest.approx(mc.sortino_ratio(pd.Series(R[p])))
+        assert mdd[p] == pytest.approx(mc.max_drawdown(pd.Series(E[p])))
+
+def test_float32_metrics_close_to_float64():
+    """
+    float32 calculations agree with float64 to well within Sharpe precision.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(11)
+    R = 0.0005 + rng.normal(0, 0.01, size=(3, 500))
+    E = np.cumprod(1 + R, axis=1) * 100
+    mc64 = MetricsCalculator(risk_free_rate=0.01)
+    mc32 = MetricsCalculator(risk_free_rate=0.01, dtype=np.float32)
+
+    assert mc32.sharpe_ratio_batch(R).dtype == np.float32
+    assert np.allclose(mc32.sharpe_ratio_batch(R), mc64.sharpe_ratio_batch(R), atol=1e-3)
+    assert np.allclose(mc32.max_drawdown_batch(E), mc64.max_drawdown_batch(E), atol=1e-5)
+    assert mc32.sharpe_ratio(pd.Series(R[0])) == pytest.approx(mc64.sharpe_ratio(pd.Series(R[0])), abs=1e-3)
@@ -24,13 +24,85 @@ def test_optimize_distinct_portfolios():
         "B": assetB
     })
     # We'll mimic "df" as daily returns for each asset
-    results = ps._optimize_distinct_portfolios(df, ["A","B"], num_portfolios=2)
+    ps._cache_returns(df)
+    results = ps._optimize_distinct_portfolios([0, 1], num_portfolios=2)
     assert len(results) > 0
     best_sharpe, best_w = results[0]
     assert isinstance(best_sharpe, float)
     assert len(best_w) == 2
     assert abs(sum(best_w) - 1.0) < 1e-8
 
+@pytest.mark.parametrize("daily_std", [0.01, 0.002, 0.001])
+def test_frontier_sweep_matches_random_restarts(monkeypatch, daily_std):
+    """
+    The frontier sweep (cvxpy) and the SLSQP restarts should agree on the best Sharpe,
+    including low-volatility universes where the tangency point is far from gamma ~ 1.
+    """
+    import src.optimization.portfolio_service as ps_module
+    pytest.importorskip("cvxpy")
+
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame(rng.normal(0.0005, daily_std, (500, 6)) + rng.normal(0, daily_std / 2, (500, 1)))
+    ps = PortfolioService(max_random_tries_factor=5, seed=0)
+    ps._cache_returns(df)
+    indices = list(range(6))
+
+    sweep_sharpe, sweep_w = ps._optimize_distinct_portfolios(indices, num_portfolios=1)[0]
+    monkeypatch.setattr(ps_module, "HAS_CVXPY", False)
+    restart_sharpe, _ = ps._optimize_distinct_portfolios(indices, num_portfolios=1)[0]
+
+    assert abs(sum(sweep_w) - 1.0) < 1e-8
+    assert sweep_sharpe == pytest.approx(restart_sharpe, rel=1e-4)
+
+def test_random_restarts_reproducible_with_seed():
+    """
+    Two services with the same seed draw the same restarts.
+    """
+    rng = np.random.default_rng(4)
+    df = pd.DataFrame(rng.normal(0.0005, 0.01, (300, 3)))
+    runs = []
+    for _ in range(2):
+        ps = PortfolioService(max_random_tries_factor=2, seed=123)
+        ps._cache_returns(df)
+        runs.append(ps._random_restarts(ps._mu, ps._Sigma, [(0.0, 1.0)] * 3, tries=4))
+    for a, b in zip(*runs):
+        assert a[0] == b[0]
+        np.testing.assert_array_equal(a[1], b[1])
+
+def test_project_to_bounds_is_feasible():
+    """
+    Projected starting points respect the exposure bounds and sum to 1.
+    """
+    from src.optimization.constraints import get_exposure_bounds
+    from src.optimization.portfolio_service import _project_to_bounds
+
+    lb, ub = np.array(get_exposure_bounds(5)).T
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        w = _project_to_bounds(rng.normal(0.2, 0.3, 5), lb, ub)
+        assert np.all(w >= lb) and np.all(w <= ub)
+        assert abs(w.sum() - 1.0) < 1e-12
+    inside = np.full(5, 0.2)
+    assert _project_to_bounds(inside, lb, ub) is inside
+
+def test_neg_sharpe_and_grad_matches_returns():
+    """
+    The compiled objective equals the Sharpe of R @ w and its gradient matches finite differences.
+    """
+    from src.optimization._kernels import neg_sharpe_and_grad
+
+    rng = np.random.default_rng(0)
+    R = rng.normal(0.0005, 0.01, (500, 4))
+    mu, sigma = R.mean(axis=0), np.cov(R, rowvar=False)
+    w = np.array([0.1, 0.2, 0.3, 0.4])
+    f, grad = neg_sharpe_and_grad(w, mu, sigma, 1.0)
+    port = R @ w
+    assert f == pytest.approx(-port.mean() / port.std(ddof=1) * np.sqrt(252))
+
+    eps = 1e-7
+    numeric = [(neg_sharpe_and_grad(w + eps * e, mu, sigma, 1.0)[0] - f) / eps for e in np.eye(4)]
+    np.testing.assert_allclose(grad, numeric, atol=1e-4)
+
 def test_eq_subset_bruteforce():
     """
     Check the eq-wgts brute force approach with a small set of assets.
@@ -41,10 +113,177 @@ def test_eq_subset_bruteforce():
         "B": [0.01, -0.005, 0.03],
         "C": [0.002, 0.002, 0.002]
     })
-    subset = ps._eq_subset_bruteforce(df, ["A","B","C"])
+    ps._cache_returns(df)
+    subset = ps._eq_subset_bruteforce([0, 1, 2])
     # Should return at least 1 asset. Possibly all if it yields best Sharpe.
     assert len(subset) >= 1
 
+def test_eq_subset_backward_elimination():
+    """
+    Backward elimination drops an asset that only adds noise to the equal-weights portfolio.
+    """
+    ps = PortfolioService()
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "A": 0.001 + rng.normal(0, 0.001, 500),
+        "B": 0.001 + rng.normal(0, 0.001, 500),
+        "C": rng.normal(0, 0.05, 500)
+    })
+    ps._cache_returns(df)
+    subset = ps._eq_subset_backward_elimination([0, 1, 2])
+    assert 2 not in subset
+    assert set(subset) <= {0, 1}
+    assert len(subset) >= 1
+
+def test_cache_returns_moments_match_pandas():
+    """
+    The cached mean/covariance match pandas, and the correlation derived from them matches df.corr().
+    """
+    rng = np.random.default_rng(2)
+    df = pd.DataFrame(rng.normal(0.001, 0.01, (300, 3)), columns=["A", "B", "C"])
+    ps = PortfolioService()
+    ps._cache_returns(df)
+    np.testing.assert_allclose(ps._mu, df.mean().to_numpy())
+    np.testing.assert_allclose(ps._Sigma, df.cov().to_numpy())
+    np.testing.assert_allclose(ps._Sigma / np.outer(ps._std, ps._std), df.corr().to_numpy())
+
+def test_tangency_weights_uncorrelated_assets():
+    """
+    With uncorrelated assets the tangency weights are proportional to mu / var.
+    """
+    from src.optimization.portfolio_service import _tangency_weights
+
+    rng = np.random.default_rng(0)
+    Z = rng.standard_normal((2000, 2))
+    Z -= Z.mean(axis=0)
+    # Whiten so the sample covariance is exactly diagonal
+    Z = Z @ np.linalg.inv(np.linalg.cholesky(np.cov(Z, rowvar=False))).T
+    R = Z * np.array([0.01, 0.02]) + np.array([0.001, 0.001])
+    w = _tangency_weights(R.mean(axis=0), np.cov(R, rowvar=False), leverage=1)
+    expected = np.array([0.001 / 0.01**2, 0.001 / 0.02**2])
+    np.testing.assert_allclose(w, expected / expected.sum(), rtol=1e-8)
+
+def test_evaluate_single_portfolio_plots_dated_equity(capsys):
+    """
+    The evaluation works on the cached ndarray and only hands dated Series to the plotter.
+    """
+    from src.analysis.metrics_calculator import MetricsCalculator
+
+    class RecordingPlotter:
+        def __init__(self):
+            self.calls = []
+
+        def plot_portfolio_evolution(self, equity, title=""):
+            self.calls.append(("portfolio", equity))
+
+        def plot_individual_equities(self, equities):
+            self.calls.append(("individual", equities))
+
+    dates = pd.date_range("2022-01-01", periods=4, freq="D")
+    df = pd.DataFrame({"A": [0.01, 0.02, -0.01, 0.0], "B": [0.0, 0.01, 0.01, -0.02]}, index=dates)
+    ps = PortfolioService()
+    ps._cache_returns(df)
+    plotter = RecordingPlotter()
+    w = np.array([0.5, 0.5])
+    ps._evaluate_and_plot_single_portfolio(w, [0, 1], MetricsCalculator(), plotter, True, "Test")
+
+    expected = (1 + (df * w).sum(axis=1)).cumprod() * 100
+    kind, equity = plotter.calls[0]
+    assert kind == "portfolio"
+    pd.testing.assert_series_equal(equity, expected, check_names=False, check_freq=False)
+    kind, indiv = plotter.calls[1]
+    assert kind == "individual"
+    pd.testing.assert_series_equal(indiv["B"], (1 + df["B"] * 0.5).cumprod() * 100, check_names=False, check_freq=False)
+    assert "Sharpe Ratio" in capsys.readouterr().out
+
+def test_batch_metrics_match_single_evaluation():
+    """
+    The batched Sharpe/Sortino/drawdown used to rank the distinct portfolios match the per-portfolio metrics.
+    """
+    from src.analysis.metrics_calculator import MetricsCalculator
+
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(rng.normal(0.0005, 0.01, (300, 3)))
+    ps = PortfolioService()
+    ps._cache_returns(df)
+    ps.leverage = 2.0
+    mc = MetricsCalculator(risk_free_rate=0.02)
+    W = np.array([[0.2, 0.3, 0.5], [0.6, 0.2, 0.2]])
+    batch = ps._batch_metrics(W, [0, 1, 2], mc)
+    for p, w in enumerate(W):
+        single = ps._evaluate_and_plot_single_portfolio(w, [0, 1, 2], mc, None, False, "Test")
+        for name in ("sharpe", "sortino", "max_drawdown"):
+            assert batch[name][p] == pytest.approx(single[name], rel=1e-9)
+
+def test_generate_best_portfolios_without_plots(tmp_path, monkeypatch):
+    """
+    With plot=False no Plotter is built and the portfolios are returned programmatically.
+    """
+    import src.optimization.portfolio_service as ps_module
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Plotter should not be used when plot=False")
+
+    monkeypatch.setattr(ps_module, "Plotter", fail)
+    rng = np.random.default_rng(3)
+    dates = pd.date_range("2022-01-01", periods=400, freq="D")
+    for sym in ["AAA", "BBB", "CCC"]:
+        close = 100 * np.cumprod(1 + rng.normal(0.001, 0.01, 400))
+        pd.DataFrame({"date": dates, "close": close}).to_csv(
+            tmp_path / f"{sym}_2022-01-01_2023-02-04.csv", index=False
+        )
+
+    ps = PortfolioService(max_random_tries_factor=2)
+    result = ps.generate_best_portfolios(
+        start="2022-01-01", end="2023-02-04", num_portfolios=2, save_path=str(tmp_path),
+        equal_weights=True, plot=False
+    )
+    assert sorted(result["symbols"]) == ["AAA", "BBB", "CCC"]
+    portfolio = result["portfolios"][0]
+    assert abs(sum(portfolio["weights"].values()) - 1.0) < 1e-8
+    assert set(portfolio["metrics"]) >= {"sharpe", "sortino", "max_drawdown", "calmar", "omega"}
+
+def test_load_prices_sorts_and_keeps_close(tmp_path):
+    """
+    _load_prices returns the close column indexed by date, sorted even if the file is not.
+    """
+    pd.DataFrame({
+        "date": ["2022-01-03", "2022-01-01", "2022-01-02"],
+        "open": [1.0, 2.0, 3.0],
+        "close": [103.0, 101.0, 102.0],
+    }).to_csv(tmp_path / "AAA_2022-01-01_2022-01-03.csv", index=False)
+
+    ps = PortfolioService()
+    quotes = ps._load_prices(["AAA", "MISSING"], {}, "2022-01-01", "2022-01-03", str(tmp_path))
+    assert list(quotes) == ["AAA"]
+    assert quotes["AAA"].tolist() == [101.0, 102.0, 103.0]
+    assert quotes["AAA"].index.is_monotonic_increasing
+
+def test_load_prices_returns_copies(tmp_path):
+    """
+    Editing a loaded series in place doesn't leak into the next load through the read cache.
+    """
+    pd.DataFrame({
+        "date": ["2022-01-01", "2022-01-02"],
+        "close": [101.0, 102.0],
+    }).to_csv(tmp_path / "AAA_2022-01-01_2022-01-02.csv", index=False)
+
+    ps = PortfolioService()
+    quotes = ps._load_prices(["AAA"], {}, "2022-01-01", "2022-01-02", str(tmp_path))
+    quotes["AAA"].iloc[0] = -1.0
+    again = ps._load_prices(["AAA"], {}, "2022-01-01", "2022-01-02", str(tmp_path))
+    assert again["AAA"].tolist() == [101.0, 102.0]
+
+def test_equity_curve_matches_cumprod():
+    """
+    The log-space equity matches (1 + r).cumprod() * 100 and floors at 0 on a total loss.
+    """
+    from src.optimization.portfolio_service import _equity_curve
+
+    r = np.random.default_rng(0).normal(0, 0.01, (1000, 3))
+    np.testing.assert_allclose(_equity_curve(r), 100 * np.cumprod(1 + r, axis=0), rtol=1e-10)
+    np.testing.assert_allclose(_equity_curve(np.array([0.1, -1.5, 0.2])), [110.0, 0.0, 0.0])
+
 def test_filter_assets_less_than_one_year():
     """
     Test that assets with <1 year of data are excluded.
@@ -72,6 +311,24 @@ def test_filter_assets_less_than_one_year():
     assert "X" in filtered
     assert "Y" not in filtered
 
+def test_filter_assets_duplicate_dates():
+    """
+    Test that a repeated date in one series doesn't break the alignment of the others.
+    """
+    import pandas as pd
+
+    ps = PortfolioService()
+    prices_a = pd.Series(
+        [100.0, 101.0, 150.0],
+        index=pd.to_datetime(["2022-01-01", "2022-01-01", "2023-06-01"])
+    )
+    prices_b = pd.Series([50.0, 40.0], index=pd.to_datetime(["2022-01-01", "2023-06-02"]))
+
+    filtered = ps._filter_assets({"A": prices_a, "B": prices_b})
+    assert list(filtered) == ["A"]
+    # The original series is returned untouched
+    assert len(filtered["A"]) == 3
+
 def test_run_all_tests():
     """
     Placeholder that indicates you can run all tests with pytest from the root directory: